@@ -0,0 +1,70 @@
+''' Adaptive sampling of a function for plotting - more samples where the plotted
+    curve bends, fewer where it is flat '''
+
+import numpy as np
+
+def pixel_deviation(x, y, x_scale, y_scale):
+    ''' for each sample, the distance (in pixels) between it and the straight line
+        joining its neighbours - zero for the end points. x_scale, y_scale are the
+        data units per pixel '''
+    X = x/x_scale
+    Y = np.nan_to_num(y/y_scale)
+    deviation = np.zeros(x.size)
+    if x.size < 3:
+        return deviation
+    # distance of the middle point from the chord of each triple of points
+    dX, dY = X[2:]-X[:-2], Y[2:]-Y[:-2]
+    cross = dX*(Y[1:-1]-Y[:-2]) - dY*(X[1:-1]-X[:-2])
+    deviation[1:-1] = np.abs(cross)/np.hypot(dX, dY).clip(1e-12)
+    # a sample next to an undefined one can't be judged - treat as badly sampled
+    bad = ~np.isfinite(y)
+    deviation[1:-1][bad[:-2] ^ bad[2:]] = np.inf
+    return deviation
+
+def adaptive_sample(f, x_min, x_max, max_evaluations, width=800, height=600,
+                    tolerance=0.5, initial=None):
+    ''' samples f over [x_min, x_max] using at most max_evaluations evaluations of f
+
+        Starts from a coarse uniform grid and repeatedly halves the intervals
+        either side of samples that are more than tolerance pixels away from
+        the straight line drawn through their neighbours (width, height is the
+        size of the plot in pixels). Each round of new samples is evaluated with
+        a single call of f on an array. Intervals less than a quarter of a pixel
+        wide are not split further.
+
+        returns x, y arrays of the samples '''
+    max_evaluations = max(3, int(max_evaluations))
+    if initial is None:
+        initial = max(3, max_evaluations//8)
+    initial = min(initial, max_evaluations)
+    x = np.linspace(x_min, x_max, initial)
+    y = np.asarray(f(x), dtype=float)*np.ones(x.size)
+    evaluations = x.size
+
+    x_scale = (x_max-x_min)/float(width) or 1.
+    while evaluations < max_evaluations:
+        finite = np.isfinite(y)
+        y_range = y[finite].max()-y[finite].min() if finite.any() else 0
+        y_scale = y_range/float(height) or 1.
+
+        # error of each interval is the worst deviation of the samples at its ends
+        deviation = pixel_deviation(x, y, x_scale, y_scale)
+        error = np.maximum(deviation[:-1], deviation[1:])
+        error[np.diff(x) < 0.25*x_scale] = 0
+        split = np.flatnonzero(error > tolerance)
+        if split.size == 0:
+            break
+
+        # not enough evaluations left - split the worst intervals first
+        remaining = max_evaluations-evaluations
+        if split.size > remaining:
+            split = split[np.argsort(error[split])[::-1][:remaining]]
+            split.sort()
+
+        new_x = 0.5*(x[split]+x[split+1])
+        new_y = np.asarray(f(new_x), dtype=float)*np.ones(new_x.size)
+        evaluations += new_x.size
+        x = np.insert(x, split+1, new_x)
+        y = np.insert(y, split+1, new_y)
+
+    return x, y
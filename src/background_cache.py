@@ -0,0 +1,92 @@
+import weakref
+
+from matplotlib.axes import Axes
+from matplotlib.axis import Axis, Tick
+
+class BackgroundCache:
+    ''' Blit backgrounds (canvas.copy_from_bbox images) of axes, kept so that a
+        background can be reused instead of redrawing the whole canvas.
+
+        Each axis keeps one background, together with the object it was drawn
+        for (eg. the DragPlot whose line was left out of it). A background is
+        only handed back while the axis limits, ticks and size on screen (figure
+        size and dpi) are the same, and no non-animated artist of the figure has
+        changed since. matplotlib marks an artist (and the axes / figure it is
+        in) 'stale' when it changes, but (since matplotlib 2.0) some artists are
+        left stale by drawing, and the throwaway tick made to find the tick
+        spacing marks its axes stale, eg. on every picked mouse press - so the
+        figure is marked drawn once a background is stored, and the artists
+        inside the axes (their ticks, grid lines, labels...) are checked rather
+        than the axes themselves '''
+
+    def __init__(self):
+        self.entries = weakref.WeakKeyDictionary()  # axis -> (owner, state, background)
+
+    def state(self, axis):
+        ''' what the background of axis depends on, apart from its artists '''
+        fig = axis.figure
+        ticks = [id(ticker) for a in (axis.xaxis, axis.yaxis)
+                 for ticker in (a.major.locator, a.major.formatter)]
+        return (tuple(axis.viewLim.bounds), tuple(axis.bbox.bounds),
+                tuple(fig.bbox.bounds), fig.dpi, tuple(ticks))
+    
+    def artists(self, fig):
+        ''' the non-animated artists of fig, and those inside its axes, axis
+            (x / y) and ticks '''
+        for artist in fig.get_children():
+            for child in self.inside(artist):
+                yield child
+
+    def inside(self, artist):
+        ''' artist and, for axes, axis and ticks, the non-animated artists in it '''
+        if artist.get_animated():
+            return
+        yield artist
+        if not isinstance(artist, (Axes, Axis, Tick)):
+            return
+        for child in artist.get_children():
+            for a in self.inside(child):
+                yield a
+
+    def mark_drawn(self, fig):
+        ''' clears the stale flags of fig's artists, once a background is stored '''
+        if not hasattr(fig, 'stale'): return
+        for artist in self.artists(fig):
+            artist.stale = False
+        fig.stale = False
+
+    def changed(self, fig):
+        ''' whether a non-animated artist of fig has changed since it was drawn -
+            the axes themselves aren't checked, as the throwaway tick marks them '''
+        # older matplotlib has no 'stale' flag - then we can't tell, so say so
+        if not hasattr(fig, 'stale'):
+            return True
+        if not fig.stale:
+            return False
+        # an axes marked stale by the throwaway tick alone hasn't changed
+        return any(artist.stale and not isinstance(artist, Axes)
+                   for artist in self.artists(fig))
+
+    def get(self, axis, owner):
+        ''' the stored background of axis if it is still good for owner, else None '''
+        entry = self.entries.get(axis)
+        if entry is None:
+            return None
+        stored_owner, state, background = entry
+        if stored_owner() is not owner or state != self.state(axis):
+            return None
+        if self.changed(axis.figure):
+            return None
+        return background
+
+    def store(self, axis, owner, background):
+        ''' keep background of axis, drawn for owner '''
+        self.entries[axis] = (weakref.ref(owner), self.state(axis), background)
+        self.mark_drawn(axis.figure)
+
+    def invalidate(self, axis=None):
+        ''' forget the background of axis (or of every axis) '''
+        if axis is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(axis, None)
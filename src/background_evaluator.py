@@ -0,0 +1,133 @@
+from multiprocessing import Pool, cpu_count
+from multiprocessing.pool import ThreadPool
+import threading
+
+import numpy as np
+
+class BackgroundEvaluator:
+    ''' Evaluates a function f on arrays of x values in a pool of worker threads
+        or processes, so the GUI isn't held up while f is evaluated
+
+        Each array of x values is split into chunks, which are sent to the
+        workers no more than one per worker at a time. Only the latest submitted
+        request matters - submitting a new one (or cancel()) supersedes the old
+        request, whose chunks not yet sent are dropped (as are those not yet
+        started, with threads) and whose results are thrown away. So at most a
+        chunk per worker is wasted on a superseded request.
+
+        The pools are shared by every evaluator of the same kind and size, and
+        stopped once the last of them is closed. With pool='process' f has to
+        be picklable (eg. a module level function, not a lambda) '''
+
+    chunks_per_worker = 4   # chunks of x per worker - smaller chunks waste less when superseded
+
+    def __init__(self, f, pool='thread', workers=None):
+        self.f = f
+        self.workers = workers or cpu_count()
+        self.processes = pool == 'process'
+        self.kind = (pool, self.workers)
+        self.pool = shared_pool(*self.kind)
+        self.lock = threading.Lock()    # chunks are sent from pool callbacks too
+        self.generation = 0     # number of the latest request
+        self.request = None     # (x, chunk sizes, chunk results) of the latest request
+        self.waiting = []       # chunks of the latest request not sent to the pool yet
+
+    def submit(self, x):
+        ''' starts evaluating f(x) in the background, superseding any earlier request '''
+        with self.lock:
+            self.generation += 1
+            chunks = np.array_split(x, max(1, min(x.size, self.workers*self.chunks_per_worker)))
+            self.request = (x, [chunk.size for chunk in chunks], [])
+            self.waiting = list(chunks)
+            self.feed()
+
+    def feed(self, finishing=0):
+        ''' sends chunks of the latest request to the pool, keeping no more than
+            one per worker in progress ('finishing' of them are just done) - the
+            lock has to be held '''
+        if self.request is None: return
+        results = self.request[2]
+        busy = sum(not r.ready() for r in results) - finishing
+        while self.waiting and busy < self.workers:
+            chunk = self.waiting.pop(0)
+            done = lambda y, generation=self.generation: self.chunk_done(generation)
+            if self.processes:
+                results.append(self.pool.apply_async(self.f, (chunk,), callback=done))
+            else:
+                results.append(self.pool.apply_async(self.evaluate_chunk,
+                                                     (self.generation, chunk), callback=done))
+            busy += 1
+
+    def chunk_done(self, generation):
+        ''' called by the pool as each chunk is evaluated - sends the next one '''
+        with self.lock:
+            if generation == self.generation:
+                self.feed(finishing=1)
+
+    def evaluate_chunk(self, generation, x):
+        ''' f(x) in a worker thread - skipped if the request has been superseded '''
+        if generation != self.generation:
+            return None
+        return self.f(x)
+
+    def cancel(self):
+        ''' abandon the latest request '''
+        with self.lock:
+            self.generation += 1
+            self.request = None
+            self.waiting = []
+
+    def pending(self):
+        ''' True if there is a request which hasn't been collected by result() '''
+        return self.request is not None
+
+    def ready(self):
+        ''' True if every chunk of the latest request has been evaluated '''
+        with self.lock:
+            # a chunk which raised doesn't send the next one itself
+            self.feed()
+            return self.request is not None and not self.waiting and \
+                   all(r.ready() for r in self.request[2])
+
+    def result(self, wait=False):
+        ''' x, f(x) of the latest request if it is ready (or, with wait=True, once it
+            is) - otherwise None. Errors raised by f are raised here '''
+        if self.request is None:
+            return None
+        if wait:
+            while not self.ready():
+                for r in list(self.request[2]):
+                    r.wait()
+        elif not self.ready():
+            return None
+        x, sizes, results = self.request
+        self.request = None
+        y = [np.asarray(r.get(), dtype=float)*np.ones(size) for r, size in zip(results, sizes)]
+        return x, np.concatenate(y)
+
+    def close(self):
+        ''' stops using the workers - they're stopped once no evaluator uses them '''
+        if self.pool is None: return
+        self.cancel()
+        release_pool(*self.kind)
+        self.pool = None
+
+# pools of workers shared by the evaluators - (kind, workers) -> [pool, evaluators using it]
+pools = {}
+
+def shared_pool(kind, workers):
+    ''' a pool of worker threads / processes, made if there isn't one yet '''
+    if (kind, workers) not in pools:
+        pool = Pool(workers) if kind == 'process' else ThreadPool(workers)
+        pools[kind, workers] = [pool, 0]
+    pools[kind, workers][1] += 1
+    return pools[kind, workers][0]
+
+def release_pool(kind, workers):
+    ''' one fewer evaluator uses the pool - it's stopped when none do '''
+    entry = pools.get((kind, workers))
+    if entry is None: return
+    entry[1] -= 1
+    if entry[1] <= 0:
+        del pools[kind, workers]
+        entry[0].terminate()
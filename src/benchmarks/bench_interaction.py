@@ -0,0 +1,221 @@
+''' Headless latency benchmarks of the mouse interaction handlers
+
+    Sends synthetic press / motion / release events to DragPlot and DragRoot,
+    and runs zoom sequences through ZoomPlot, on the Agg backend - for a range
+    of point counts, with and without labels. For each case it reports the
+    median (p50) and 99th percentile (p99) time per event, the growth in peak
+    memory, and how many full canvas draws and blits were made. Each case is
+    run in a new interpreter, so its peak memory isn't hidden by the cases run
+    before it. The time taken to import the package (and each class) in a new
+    interpreter is measured too.
+
+    Results are written as JSON (one object per case) so runs can be compared
+    to catch regressions, eg. from the src directory:
+
+        python benchmarks/bench_interaction.py --output bench.json
+        python benchmarks/bench_interaction.py --sizes 10 1000 --events 50 '''
+
+import os
+import sys
+import json
+import subprocess
+import resource
+import argparse
+from timeit import default_timer as timer
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.backend_bases import MouseEvent
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)    # the package
+sys.path.insert(0, SRC)
+from interactive_plot import DragPlot, DragRoot, ZoomPlot
+from instrumentation import InteractionStats
+
+SIZES = [10, 100, 1000, 10**4, 10**5, 10**6]
+LABELS = [None, 'text', 'batch', 'virtual']
+MAX_LABELS = 10**4      # every label is drawn on press, which takes minutes past this
+                        # (not in 'virtual' label_mode, which only draws those in view)
+
+def peak_memory():
+    ''' peak resident memory of this process in kB (since it started - see run_case) '''
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak/1024 if sys.platform == 'darwin' else peak
+
+def percentiles(times):
+    ''' p50 / p99 of times in milliseconds '''
+    times = 1000*np.asarray(times)
+    if times.size == 0:
+        return None, None
+    return float(np.percentile(times, 50)), float(np.percentile(times, 99))
+
+def send(plot, name, x, y):
+    ''' sends a mouse event at data coordinates x, y and returns how long it took '''
+    px, py = plot.axis.transData.transform((x, y))
+    event = MouseEvent(name, plot.canvas, px, py, button=1)
+    start = timer()
+    plot.canvas.callbacks.process(name, event)
+    return timer()-start
+
+def bench_drag(kind, N, labels, events):
+    ''' drags points of an N point DragPlot / DragRoot about, 'events' motions per drag '''
+    memory = peak_memory()
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    x = np.linspace(0, 10, N)
+    y = np.sin(x)
+    points, = ax.plot(x, y, 'o', linestyle='')
+    ax.set_xlim(-0.5, 10.5)
+    ax.set_ylim(-1.5, 1.5)
+
+    label = None if labels is None else [str(i) for i in range(N)]
+    label_mode = labels or 'text'
+    start = timer()
+    if kind == 'DragRoot':
+        plot = DragRoot(points, np.sin, label=label, label_mode=label_mode, spatial_index=True)
+    else:
+        plot = DragPlot(points, label=label, label_mode=label_mode, spatial_index=True)
+    construct = timer()-start
+    fig.canvas.draw()
+    # the draws and blits counted as with instrument() - without timing the handlers too
+    stats = InteractionStats()
+    stats.watch_canvas(fig.canvas)
+
+    times = {'press': [], 'motion': [], 'release': []}
+    for grab in [N//4, N//2, 3*N//4]:
+        x0, y0 = x[grab], y[grab]
+        times['press'].append(send(plot, 'button_press_event', x0, y0))
+        for step in range(events):
+            times['motion'].append(send(plot, 'motion_notify_event',
+                                        x0+0.2*np.sin(step/5.), y0+0.2*np.cos(step/5.)))
+        times['release'].append(send(plot, 'button_release_event', x0, y0))
+
+    result = {'benchmark': kind, 'points': N, 'labels': labels,
+              'construct_ms': 1000*construct,
+              'draws': stats.count('draw'), 'blits': stats.count('blit'),
+              'peak_memory_growth_kb': peak_memory()-memory}
+    for name, t in times.items():
+        result[name+'_p50_ms'], result[name+'_p99_ms'] = percentiles(t)
+    plot.disconnect()
+    plt.close(fig)
+    return result
+
+def bench_zoom(N, events):
+    ''' zooms an N point ZoomPlot in and out, and pans it '''
+    memory = peak_memory()
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    start = timer()
+    zoom = ZoomPlot(np.sin, ax, x_min=0, x_max=100, Npoints=N)
+    construct = timer()-start
+    fig.canvas.draw()
+    # the draws and blits counted as with instrument() - without timing the handlers too
+    stats = InteractionStats()
+    stats.watch_canvas(fig.canvas)
+
+    times = []
+    for step in range(events):
+        start = timer()
+        if step % 3 == 2:
+            x_min, x_max = ax.get_xlim()
+            shift = 0.1*(x_max-x_min)
+            zoom.set_xlim(x_min+shift, x_max+shift)
+        else:
+            zoom.scale_x(0.8 if step % 6 < 3 else 1.25)
+        times.append(timer()-start)
+
+    result = {'benchmark': 'ZoomPlot', 'points': N, 'labels': None,
+              'construct_ms': 1000*construct,
+              'draws': stats.count('draw'), 'blits': stats.count('blit'),
+              'peak_memory_growth_kb': peak_memory()-memory}
+    result['zoom_p50_ms'], result['zoom_p99_ms'] = percentiles(times)
+    plt.close(fig)
+    return result
+
+IMPORT_SCRIPT = '''
+import sys
+from timeit import default_timer as timer
+start = timer()
+import interactive_plot
+%s
+print timer()-start, 'matplotlib.pyplot' in sys.modules
+'''
+
+def bench_import(runs):
+    ''' time to import interactive_plot (and then to use each class) in a new
+        interpreter, and whether that imported matplotlib.pyplot '''
+    results = []
+    for name in [None, 'ClickPlot', 'DragPlot', 'DragRoot', 'ZoomPlot', 'DataZoomPlot']:
+        script = IMPORT_SCRIPT % ('interactive_plot.'+name if name else '')
+        times = []
+        for run in range(runs):
+            output = subprocess.check_output([sys.executable, '-c', script], cwd=SRC)
+            seconds, pyplot = output.split()
+            times.append(float(seconds))
+        result = {'benchmark': 'import', 'class': name, 'pyplot_imported': pyplot == 'True'}
+        result['import_p50_ms'], result['import_p99_ms'] = percentiles(times)
+        results.append(result)
+        sys.stderr.write('import %s p50=%.1fms\n' % (name or 'interactive_plot', result['import_p50_ms']))
+    return results
+
+def run_case(kind, N, labels, events):
+    ''' a drag / zoom benchmark case, run in a new interpreter '''
+    command = [sys.executable, os.path.abspath(__file__), '--events', str(events),
+               '--case', kind, str(N), str(labels)]
+    return json.loads(subprocess.check_output(command, cwd=SRC))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='numbers of points to benchmark')
+    parser.add_argument('--events', type=int, default=30,
+                        help='motion events per drag, and zoom steps')
+    parser.add_argument('--max-labels', type=int, default=MAX_LABELS,
+                        help='largest number of points to benchmark with labels')
+    parser.add_argument('--import-runs', type=int, default=5,
+                        help='new interpreters started to time each import')
+    parser.add_argument('--only', choices=['import', 'DragPlot', 'DragRoot', 'ZoomPlot'], nargs='+',
+                        default=['import', 'DragPlot', 'DragRoot', 'ZoomPlot'])
+    parser.add_argument('--output', help='file to write the JSON results to (default stdout)')
+    parser.add_argument('--case', nargs=3, metavar=('KIND', 'N', 'LABELS'),
+                        help='run just one case in this interpreter and print its result (see run_case)')
+    args = parser.parse_args()
+
+    if args.case:
+        kind, N, labels = args.case[0], int(args.case[1]), args.case[2]
+        labels = None if labels == 'None' else labels
+        if kind == 'ZoomPlot':
+            result = bench_zoom(N, args.events)
+        else:
+            result = bench_drag(kind, N, labels, args.events)
+        print json.dumps(result)
+        return
+
+    results = []
+    if 'import' in args.only:
+        results += bench_import(args.import_runs)
+    for N in args.sizes:
+        for kind in ['DragPlot', 'DragRoot']:
+            if kind not in args.only: continue
+            for labels in LABELS:
+                if labels in ('text', 'batch') and N > args.max_labels: continue
+                results.append(run_case(kind, N, labels, args.events))
+                sys.stderr.write('%(benchmark)s N=%(points)d labels=%(labels)s motion p50=%(motion_p50_ms).3fms\n' % results[-1])
+        if 'ZoomPlot' in args.only:
+            results.append(run_case('ZoomPlot', N, None, args.events))
+            sys.stderr.write('ZoomPlot N=%(points)d zoom p50=%(zoom_p50_ms).3fms\n' % results[-1])
+
+    output = json.dumps({'backend': matplotlib.get_backend(),
+                         'matplotlib': matplotlib.__version__,
+                         'numpy': np.__version__,
+                         'results': results}, indent=1, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print output
+
+if __name__ == '__main__':
+    main()
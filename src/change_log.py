@@ -0,0 +1,82 @@
+import numpy as np
+
+class ChangeLog:
+    ''' Changes to the points of a line, waiting to be reported - as batches of
+        (indices, old, new), old and new being (n, 2) arrays of x, y values.
+
+        Batches are merged once there are more than max_batches of them, keeping
+        only the first old and last new value of each point, so the log holds
+        at most one entry per changed point however long it waits '''
+
+    max_batches = 64
+
+    def __init__(self):
+        self.batches = []
+
+    def add(self, indices, old, new):
+        ''' adds the change of the points at indices from old to new x, y values '''
+        self.batches.append((np.asarray(indices, dtype=int),
+                             np.asarray(old, dtype=float).reshape(-1, 2),
+                             np.asarray(new, dtype=float).reshape(-1, 2)))
+        if len(self.batches) > self.max_batches:
+            self.batches = [self.merged()]
+
+    def merged(self):
+        ''' all the batches as one, with each point's earliest old and latest new value '''
+        indices = np.concatenate([b[0] for b in self.batches])
+        old = np.concatenate([b[1] for b in self.batches])
+        new = np.concatenate([b[2] for b in self.batches])
+        # stable sort keeps each point's changes in the order they were made
+        order = np.argsort(indices, kind='mergesort')
+        indices, old, new = indices[order], old[order], new[order]
+        first = np.flatnonzero(np.r_[True, indices[1:] != indices[:-1]])
+        last = np.r_[first[1:]-1, indices.size-1]
+        return indices[first], old[first], new[last]
+
+    def flush(self):
+        ''' (indices, old, new) of the points that have changed since the last
+            flush - points moved back to where they were are left out - or None '''
+        if not self.batches:
+            return None
+        indices, old, new = self.merged()
+        self.batches = []
+        moved = ~np.all((old == new) | (np.isnan(old) & np.isnan(new)), axis=1)
+        if not moved.any():
+            return None
+        return indices[moved], old[moved], new[moved]
+
+class ChangeSubscription:
+    ''' Sends callback(indices, old, new) the changes to a DragPlot's points at
+        the chosen rate:
+            'frame' - after every drawn motion of a dragged point
+            'debounce' - once the dragged point has been still for 'delay' seconds
+            'release' - when the dragged point is let go
+        Changes made when nothing is being dragged are sent straight away, and
+        all rates are sent whatever is left when a point is released '''
+
+    def __init__(self, callback, rate, delay, canvas):
+        self.callback = callback
+        self.rate = rate
+        self.log = ChangeLog()
+        self.timer = None
+        if rate == 'debounce':
+            self.timer = canvas.new_timer(interval=max(1, int(1000*delay)))
+            self.timer.single_shot = True
+            self.timer.add_callback(self.deliver)
+
+    def changed(self, dragging):
+        ''' called after changes are added to the log '''
+        if not dragging:
+            self.deliver()
+        elif self.timer is not None:
+            # wait for the changes to stop
+            self.timer.stop()
+            self.timer.start()
+
+    def deliver(self):
+        ''' sends the logged changes, if there are any '''
+        if self.timer is not None:
+            self.timer.stop()
+        changes = self.log.flush()
+        if changes is not None:
+            self.callback(*changes)
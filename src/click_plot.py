@@ -1,12 +1,19 @@
 from sanitise_input import SanitiseInput
+from spatial_index import GridIndex
+from label_collection import LabelCollection
+from virtual_labels import VirtualLabels
+from instrumentation import Instrumented
 
 import numpy as np
 import matplotlib.transforms as tfm
 
-class ClickPlot(SanitiseInput):
+class ClickPlot(SanitiseInput, Instrumented):
     '''functions regarding clicking on plots'''
     
-    def __init__(self, line, label=None, label_size=20):
+    timed_methods = ('get_closest_point', 'get_closest_point_axis')
+    
+    def __init__(self, line, label=None, label_size=20, spatial_index=False,
+                 label_mode='text', max_labels=200):
         # plot line to use, and associated axis, figure, canvas
         self.line = self.sanitise_line_input(line)  # data points
         self.axis = self.line.get_axes()    # axis the data points are located in
@@ -14,8 +21,15 @@ class ClickPlot(SanitiseInput):
         self.canvas = self.fig.canvas       # canvas ...
         # text labels for each data point
         self.label = self.sanitise_label_input(label)
+        # 'text' - one Text per label, 'batch' - all labels in one LabelCollection,
+        # 'virtual' - only labels in view drawn, by at most max_labels Text artists
+        self.label_mode = self.sanitise_label_mode_input(label_mode)
+        self.max_labels = self.sanitise_max_labels_input(max_labels)
         # make labels for each data point (with appropriate transform)
         self.make_text(label_size)
+        # optionally use a grid of the data points to find the closest point to a click
+        self.spatial_index = spatial_index
+        self.grid = None    # built when first needed - see get_grid()
             
     def make_text(self, label_size):
         ''' creates text labels for plot '''
@@ -25,7 +39,6 @@ class ClickPlot(SanitiseInput):
             return
         
         # create text labels with same coordinates as data
-        self.text = []
         x = self.line.get_xdata()
         y = self.line.get_ydata()
         
@@ -34,7 +47,19 @@ class ClickPlot(SanitiseInput):
         offset = tfm.ScaledTranslation(dx, dy, self.fig.dpi_scale_trans)
         text_transform = self.axis.transData + offset
         
+        # all labels held by a single artist
+        if self.label_mode == 'batch':
+            self.text = LabelCollection(self.axis, x, y, self.label,
+                                        text_transform, size=label_size)
+            return
+        # only the labels in view drawn (see VirtualLabels)
+        if self.label_mode == 'virtual':
+            self.text = VirtualLabels(self.axis, x, y, self.label, text_transform,
+                                      size=label_size, max_labels=self.max_labels)
+            return
+        
         # set coordinates
+        self.text = []
         for i in range(0,len(self.label)):
             t = self.axis.text(x[i], y[i], self.label[i],
                              transform=text_transform, size=label_size)
@@ -51,20 +76,68 @@ class ClickPlot(SanitiseInput):
     def set_xdata(self,x):
         ''' sets the x-data of the points '''
         self.line.set_xdata(x)
+        self.grid = None    # data replaced - rebuild grid when next needed
         
         # if there is text data, move them too
         if self.text is None: return
+        if self.label_mode != 'text':
+            self.text.set_xoffsets(x)
+            return
         for i in range(0,len(x)):
             self.text[i].set_x(x[i]) 
         
     def set_ydata(self,y):
         ''' sets the y-data of the points '''
         self.line.set_ydata(y)
+        self.grid = None    # data replaced - rebuild grid when next needed
         
         # if there is text data, move them too
         if self.text is None: return
+        if self.label_mode != 'text':
+            self.text.set_yoffsets(y)
+            return
         for i in range(0,len(y)):
             self.text[i].set_y(y[i])
+    
+    def set_point(self, i, x, y):
+        ''' sets the i'th data point to x,y - only the i'th text label is moved
+            and the grid (if any) is updated rather than rebuilt '''
+        xdata = self.line.get_xdata()
+        ydata = self.line.get_ydata()
+        xdata[i] = x
+        ydata[i] = y
+        self.line.set_xdata(xdata)
+        self.line.set_ydata(ydata)
+        
+        if self.grid is not None:
+            self.grid.update(i, x, y)
+        if self.text is None:
+            return
+        if self.label_mode != 'text':
+            self.text.set_offset(i, x, y)
+        else:
+            self.text[i].set_position((x, y))
+    
+    def label_artists(self):
+        ''' list of the artists drawing the labels '''
+        if self.text is None:
+            return []
+        if self.label_mode != 'text':
+            return [self.text]
+        return self.text
+    
+    def label_artist(self, i):
+        ''' the Text artist for the i'th label - eg. to animate it on its own '''
+        if self.label_mode != 'text':
+            return self.text.single(i)
+        return self.text[i]
+    
+    def get_grid(self):
+        ''' the grid of data points used for closest point look ups, (re)built
+            if the data has been replaced since it was last used '''
+        if self.grid is None:
+            self.grid = GridIndex(self.line.get_xdata(), self.line.get_ydata())
+        return self.grid
             
     def draw(self):
         ''' draw this figure '''
@@ -74,6 +147,10 @@ class ClickPlot(SanitiseInput):
         ''' given data coordinates x,y - return the closest point from line data '''
         line_xs = self.line.get_xdata()
         line_ys = self.line.get_ydata()
+        if self.spatial_index:
+            min_index, distance = self.get_grid().closest(x, y)
+            if min_index is not None:
+                return min_index, line_xs[min_index], line_ys[min_index]
         distance = np.hypot(x-line_xs,y-line_ys)
 
         # get closest point index and the x/y distances from the click to the closest point
@@ -91,6 +168,11 @@ class ClickPlot(SanitiseInput):
         
         x_range = x_max-x_min
         y_range = y_max-y_min
+        if self.spatial_index:
+            min_index, min_distance = self.get_grid().closest(x, y, x_range, y_range)
+            if min_index is not None:
+                return min_index, min_distance
+        
         line_xs = self.line.get_xdata()
         line_ys = self.line.get_ydata()
         
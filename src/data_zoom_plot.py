@@ -0,0 +1,93 @@
+import numpy as np
+
+from zoom_view import ZoomView
+from minmax_pyramid import MinMaxPyramid
+from errors import NotNumpyArray, DimensionMismatch
+
+class DataZoomPlot(ZoomView):
+    ''' Like ZoomPlot, but for data that has already been sampled - eg. a very
+        long measurement stored on disk - instead of a function
+
+        data is a 1-D numpy array (memory mapped arrays are read as needed) or the
+        file name of a .npy file, which is memory mapped. The x value of each
+        sample is either given as a sorted array x, or as x0 + i*dx.
+
+        A MinMaxPyramid of the data is built once, and each new x-range only reads
+        the level and slice of the pyramid that fit the width of the axis - so
+        zooming costs the same however long the data is. It zooms and pans like
+        ZoomPlot (see ZoomView), but has no function or number of points to set -
+        the number of points drawn follows the axis width '''
+
+    def __init__(self, data, axis=None, x=None, x0=0., dx=1., x_min=None, x_max=None,
+                 interactive=False):
+
+        self.setup_view(axis)   # axis, figure and canvas
+
+        # the data, its x values and its pyramid
+        self.data = self.sanitise_data_input(data)
+        if x is not None:
+            x = self.sanitise_data_input(x)
+            if x.size != self.data.size:
+                raise DimensionMismatch, "DataZoomPlot(data, x=x) - x needs a value for every data point"
+        self.data_x = x
+        self.x0, self.dx = x0, dx
+        self.pyramid = MinMaxPyramid(self.data)
+
+        # number of points read for the last view
+        self.sample_stats = {'points': 0}
+
+        # x/y values to (initially) plot - all of the data
+        if x_min is None: x_min = self.index_to_x(0)
+        if x_max is None: x_max = self.index_to_x(self.data.size-1)
+        self.line, = self.axis.plot([], [])
+        self.set_xlim(x_min, x_max, draw=False)
+        # the number of pixels changes with the window size
+        self.cid_resize = self.canvas.mpl_connect('resize_event', self.on_resize)
+        # zooming / panning with the mouse and keyboard
+        self.setup_interaction(interactive)
+
+    def sanitise_data_input(self, data):
+        ''' data needs to be a 1-D numpy array, or the name of a .npy file of one '''
+        if isinstance(data, basestring):
+            data = np.load(data, mmap_mode='r')
+        if not isinstance(data, np.ndarray) or data.ndim != 1:
+            raise NotNumpyArray, "DataZoomPlot(data) - data needs to be a 1-D numpy array or .npy file name"
+        return data
+
+    def index_to_x(self, index):
+        ''' x values at (possibly fractional) positions in the data '''
+        if self.data_x is None:
+            return self.x0 + np.asarray(index)*self.dx
+        # interpolate between the neighbouring x values
+        index = np.asarray(index, dtype=float)
+        lo = np.clip(np.floor(index).astype(int), 0, self.data.size-1)
+        hi = np.clip(lo+1, 0, self.data.size-1)
+        x_lo = np.asarray(self.data_x[lo], dtype=float)
+        return x_lo + (index-lo)*(np.asarray(self.data_x[hi], dtype=float)-x_lo)
+
+    def x_to_index(self, x_min, x_max):
+        ''' range of data positions i0, i1 (one past the end) covering x_min to x_max,
+            with one extra sample either side so the line reaches the axis edges '''
+        N = self.data.size
+        if self.data_x is None:
+            i0 = int(np.floor((x_min-self.x0)/self.dx))
+            i1 = int(np.ceil((x_max-self.x0)/self.dx))+1
+        else:
+            i0 = int(np.searchsorted(self.data_x, x_min))-1
+            i1 = int(np.searchsorted(self.data_x, x_max, side='right'))+1
+        return min(max(i0, 0), N), min(max(i1, 0), N)
+
+    def sample(self, x_min, x_max):
+        ''' x, y to draw the data between x_min and x_max at the axis width '''
+        i0, i1 = self.x_to_index(x_min, x_max)
+        if i1 <= i0:
+            return np.array([]), np.array([])
+        columns = max(1, int(self.axis.bbox.width))
+        index, y = self.pyramid.view(i0, i1, columns)
+        self.sample_stats['points'] = y.size
+        return self.index_to_x(index), y
+
+    def on_resize(self, event):
+        # more or fewer pixels to fill - read the data again for the new width
+        x_min, x_max = self.axis.get_xlim()
+        self.set_xlim(x_min, x_max, draw=False)
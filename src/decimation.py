@@ -0,0 +1,58 @@
+''' Picking a few of many x,y samples to draw, without visibly changing the
+    drawn line - x values must be sorted in increasing order '''
+
+import numpy as np
+
+def minmax_decimate(x, y, x_min, x_max, columns):
+    ''' indices of the samples to draw when x_min..x_max is drawn across
+        'columns' pixels: in each pixel column the lowest and highest sample
+        (so no peak is lost) and the first undefined one (so gaps stay gaps),
+        plus the first and last samples '''
+    N = x.size
+    if N <= 4*columns:
+        return np.arange(N)
+
+    # pixel column of each sample - samples are sorted so columns are contiguous
+    column = np.floor((x-x_min)*(columns/float(x_max-x_min)))
+    column = np.clip(column, -1, columns).astype(int)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(column))+1))
+    counts = np.diff(np.append(starts, N))
+    segment = np.repeat(np.arange(starts.size), counts)
+
+    def first_in_segment(mask):
+        ''' index of the first True of mask in each segment that has one '''
+        positions = np.flatnonzero(mask)
+        segments, first = np.unique(segment[positions], return_index=True)
+        return positions[first]
+
+    lowest = np.repeat(np.fmin.reduceat(y, starts), counts)
+    highest = np.repeat(np.fmax.reduceat(y, starts), counts)
+    keep = [[0, N-1], first_in_segment(y == lowest), first_in_segment(y == highest),
+            first_in_segment(np.isnan(y))]
+    return np.unique(np.concatenate(keep))
+
+def lttb(x, y, threshold):
+    ''' indices of the samples picked by Largest-Triangle-Three-Buckets: the
+        samples between the first and last are split into threshold-2 buckets,
+        and from each bucket the sample making the largest triangle with the
+        sample picked from the previous bucket and the average of the next
+        bucket is kept. LTTB alone can pass over a narrow peak, so the lowest
+        and highest sample of each bucket are kept too - at most
+        3*(threshold-2)+2 samples '''
+    N = x.size
+    if N <= threshold or threshold < 3:
+        return np.arange(N)
+
+    y = np.nan_to_num(y)
+    edges = np.linspace(1, N-1, threshold-1).astype(int)   # buckets between first & last
+    keep = [0, N-1]
+    a = 0
+    for i in range(threshold-2):
+        lo, hi = edges[i], edges[i+1]
+        # average of the next bucket (or the last sample)
+        nlo, nhi = hi, edges[i+2] if i+2 < edges.size else N
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a]-cx)*(y[lo:hi]-y[a]) - (x[a]-x[lo:hi])*(cy-y[a]))
+        a = lo + area.argmax()
+        keep.extend((a, lo + y[lo:hi].argmin(), lo + y[lo:hi].argmax()))
+    return np.unique(keep)
@@ -0,0 +1,109 @@
+import weakref
+
+class DragDispatcher(object):
+    ''' Handles the mouse events of a canvas for every DragPlot on it
+
+        Only one set of press / motion / release callbacks is connected per
+        canvas. A press is routed to the DragPlots in the clicked axis, and the
+        closest point over all of their lines is picked - the DragPlot owning it
+        is sent the press (its on_press starts the drag), holds the lock until
+        the point is released, and is the only one sent the motion and release
+        events in the meantime.
+
+        The lock belongs to the canvas, so dragging in one figure doesn't stop
+        points being picked up in another. The canvas and the DragPlots are only
+        weakly referenced, so a closed figure isn't kept alive by its dispatcher '''
+
+    dispatchers = weakref.WeakKeyDictionary()   # canvas -> its DragDispatcher
+
+    @classmethod
+    def for_canvas(cls, canvas):
+        ''' the DragDispatcher of canvas, made if it doesn't exist yet '''
+        dispatcher = cls.dispatchers.get(canvas)
+        if dispatcher is None:
+            dispatcher = cls.dispatchers[canvas] = cls(canvas)
+        return dispatcher
+
+    def __init__(self, canvas):
+        self.canvas_ref = weakref.ref(canvas)
+        self.plot_refs = [] # weak references to the registered DragPlots
+        self.lock = None    # the DragPlot with a point being dragged
+        self.cids = None    # connection ids, when connected
+        self.press = None   # (press event, {DragPlot: (index, distance) of its closest point})
+
+    @property
+    def canvas(self):
+        ''' the canvas, None once it's gone '''
+        return self.canvas_ref()
+
+    @property
+    def plots(self):
+        ''' the registered DragPlots still in use '''
+        return [plot for plot in (ref() for ref in self.plot_refs) if plot is not None]
+
+    def register(self, plot):
+        ''' start sending mouse events to plot '''
+        if plot not in self.plots:
+            self.plot_refs.append(weakref.ref(plot))
+        if self.cids is None:
+            self.connect()
+
+    def unregister(self, plot):
+        ''' stop sending mouse events to plot '''
+        self.plot_refs = [ref for ref in self.plot_refs if ref() not in (plot, None)]
+        if self.lock is plot:
+            self.lock = None
+        if not self.plots:
+            self.disconnect()
+
+    def connect(self):
+        # connect all gui related events
+        self.cids = [self.canvas.mpl_connect('button_press_event', self.on_press),
+                     self.canvas.mpl_connect('button_release_event', self.on_release),
+                     self.canvas.mpl_connect('motion_notify_event', self.on_motion)]
+
+    def disconnect(self):
+        # disconnect all the stored connection ids
+        if self.cids is None: return
+        canvas = self.canvas
+        for cid in self.cids:
+            if canvas is not None:
+                canvas.mpl_disconnect(cid)
+        self.cids = None
+
+    def on_press(self, event):
+        # only pick a point if nothing is being dragged on this canvas
+        if event.inaxes is None: return
+        if self.lock is not None: return
+
+        # closest point within select radius over all the lines in the clicked axis
+        closest = {}
+        picked, picked_distance = None, None
+        for plot in self.plots:
+            if plot.axis is not event.inaxes: continue
+            index, distance = closest[plot] = plot.get_closest_point_axis(event.xdata, event.ydata)
+            if distance > plot.select_radius: continue
+            if picked is None or distance < picked_distance:
+                picked, picked_distance = plot, distance
+
+        if picked is not None:
+            self.press = (event, closest)
+            try:
+                picked.on_press(event)
+            finally:
+                self.press = None
+
+    def closest_point(self, plot, event):
+        ''' index and distance of plot's closest point to a press - as found
+            when picking between the plots, if event is the press being sent '''
+        if self.press is not None and self.press[0] is event and plot in self.press[1]:
+            return self.press[1][plot]
+        return plot.get_closest_point_axis(event.xdata, event.ydata)
+
+    def on_motion(self, event):
+        if self.lock is not None:
+            self.lock.on_motion(event)
+
+    def on_release(self, event):
+        if self.lock is not None:
+            self.lock.on_release(event)
@@ -1,137 +1,435 @@
 from click_plot import ClickPlot
+from background_cache import BackgroundCache
+from drag_dispatcher import DragDispatcher
+from change_log import ChangeSubscription
 from errors import DimensionMismatch
 
+import time
+import numpy as np
+from matplotlib.lines import Line2D
+
+class DragPlotType(type):
+    ''' type of DragPlot, giving the class attribute DragPlot.lock (from before
+        each canvas had its own lock - see DragDispatcher) '''
+    
+    def get_lock(cls):
+        ''' a DragPlot with a point being dragged on any canvas, or None '''
+        for dispatcher in DragDispatcher.dispatchers.values():
+            if dispatcher.lock is not None:
+                return dispatcher.lock
+        return None
+    
+    def set_lock(cls, plot):
+        ''' locks the canvas of plot to it - or with None, unlocks every canvas '''
+        if plot is None:
+            for dispatcher in DragDispatcher.dispatchers.values():
+                dispatcher.lock = None
+        else:
+            plot.dispatcher.lock = plot
+    
+    lock = property(get_lock, set_lock)
+
 class DragPlot(ClickPlot, object):  # object is there so that the super() call in __init__ works
     '''allow the data points of a 'line' to be dragged and changed'''
     
-    lock = None # only 1 point dragged at a time
+    __metaclass__ = DragPlotType
+    backgrounds = BackgroundCache() # axis backgrounds reused from one drag to the next
+    timed_methods = ClickPlot.timed_methods + ('on_press', 'on_motion', 'on_release')
     
-    def __init__(self, line, label=None, select_radius=0.1):
+    def __init__(self, line, label=None, select_radius=0.1, spatial_index=False,
+                 label_mode='text', max_fps=None, max_labels=200):
         
-        super(DragPlot, self).__init__(line, label=label)
+        super(DragPlot, self).__init__(line, label=label, spatial_index=spatial_index,
+                                       label_mode=label_mode, max_labels=max_labels)
         self.index = None               # index to selected data point
         self.background = None          # axis background image - used for smooth animation
         self.selected_point = self.make_selected_point() # a mark to indicate selected data
+        self.drag_line = self.make_drag_line()  # stands in for the dragged part of line
         self.select_radius = select_radius # tolerance of clicking to select point in axis units
+        
+        # motion coalescing - with max_fps set, motion events arriving faster than
+        # max_fps only replace the pending motion, which is drawn when the frame is due
+        self.max_fps = max_fps
+        self.pending_motion = None      # newest (x, y) of the mouse not yet drawn
+        self.last_frame = 0.            # time the last motion was drawn
+        self.frame_timer = None         # draws the pending motion when the frame is due
+        if max_fps is not None:
+            self.frame_timer = self.canvas.new_timer()
+            self.frame_timer.single_shot = True
+            self.frame_timer.add_callback(self.draw_motion)
+        self.motion_stats = {'received': 0, 'drawn': 0, 'dropped': 0}
+        self.subscriptions = []         # ChangeSubscriptions told of changed points
+        self.views = [self]             # DragPlots sharing this one's data - see link()
+        
+        # mouse events come from the canvas' dispatcher, which also holds the
+        # lock making sure only 1 point is dragged at a time on the canvas
+        self.dispatcher = DragDispatcher.for_canvas(self.canvas)
         self.connect()                  # connect events
     
+    def subscribe(self, callback, rate='frame', delay=0.25):
+        ''' callback(indices, old, new) is sent the points that have changed -
+            old and new are (n, 2) arrays of their x, y values before and after.
+            rate is how often it's sent them while a point is dragged:
+                'frame' - after every drawn motion
+                'debounce' - when the point has been still for delay seconds
+                'release' - when the point is let go
+            returns the subscription, to pass to unsubscribe '''
+        rate = self.sanitise_rate_input(rate)
+        subscription = ChangeSubscription(callback, rate, delay, self.canvas)
+        self.subscriptions.append(subscription)
+        return subscription
+    
+    def view_subscriptions(self):
+        ''' the subscriptions of this and every linked view - all are sent the
+            changes made in any of them '''
+        return [subscription for view in self.views for subscription in view.subscriptions]
+    
+    def unsubscribe(self, subscription):
+        ''' stop sending changes to a subscription '''
+        if subscription in self.subscriptions:
+            subscription.deliver()
+            self.subscriptions.remove(subscription)
+    
+    def link(self, *plots):
+        ''' shares the data of this DragPlot with other DragPlots (and any linked
+            to them) - eg. the same points in a log scaled axis and a zoomed inset.
+            Their lines are given this line's x, y arrays, not copies, and dragging
+            a point in any of them redraws it in all of them by blitting '''
+        x, y = self.line.get_xdata(), self.line.get_ydata()
+        views = list(self.views)
+        for plot in plots:
+            if np.size(plot.line.get_xdata()) != np.size(x):
+                raise DimensionMismatch, "DragPlot.link(plot) - linked plots need the same number of data points"
+            views += [view for view in plot.views if view not in views]
+        for view in views:
+            view.views = views
+            if view is not self:
+                super(DragPlot, view).set_xdata(x)
+                super(DragPlot, view).set_ydata(y)
+    
+    def unlink(self):
+        ''' stops sharing data with linked DragPlots - this one gets its own copy '''
+        if len(self.views) == 1: return
+        self.views.remove(self)
+        self.views = [self]
+        super(DragPlot, self).set_xdata(np.array(self.line.get_xdata()))
+        super(DragPlot, self).set_ydata(np.array(self.line.get_ydata()))
+    
+    def linked_views(self):
+        ''' the other DragPlots sharing this one's data '''
+        return [view for view in self.views if view is not self]
+    
+    @property
+    def lock(self):
+        ''' the DragPlot with a point being dragged on this canvas, or None '''
+        return self.dispatcher.lock
+    
+    @lock.setter
+    def lock(self, plot):
+        self.dispatcher.lock = plot
+    
     def connect(self):
-        # connect all gui related events 
-        self.cidpress = self.canvas.mpl_connect('button_press_event', self.on_press)
-        self.cidrelease = self.canvas.mpl_connect('button_release_event', self.on_release)
-        self.cidmotion = self.canvas.mpl_connect('motion_notify_event', self.on_motion)
+        # have the canvas' dispatcher send us the gui related events
+        self.dispatcher.register(self)
         
     def disconnect(self):
-        # disconnect all the stored connection ids
-        self.line.figure.canvas.mpl_disconnect(self.cidpress)
-        self.line.figure.canvas.mpl_disconnect(self.cidrelease)
-        self.line.figure.canvas.mpl_disconnect(self.cidmotion) 
+        # stop receiving events
+        self.dispatcher.unregister(self)
         
     def on_press(self, event):
-        # make sure click is in this axis and DragPlot isn't locked
+        # make sure click is in this axis and the canvas isn't locked
+        # (the dispatcher sends the press to the DragPlot with the closest point)
         if event.inaxes != self.axis: return
-        if DragPlot.lock is not None: return
+        if self.dispatcher.lock is not None: return
         
-        # get location of click
-        x_click = event.xdata
-        y_click = event.ydata
-        
-        # get closest point information
-        index, distance = self.get_closest_point_axis(x_click,y_click)
+        # get closest point information (as found by the dispatcher)
+        index, distance = self.dispatcher.closest_point(self, event)
         if distance > self.select_radius: 
             return
         else:
-            # We've picked this point, lock all others
-            DragPlot.lock = self
-            self.index = index
-        
-            # draw everything but the selected line & text label and store it in pixel buffer
-            # set selected dx > self.select_radius or dytext and point to "animated"
-            self.line.set_animated(True)
-            if self.text is not None:
-                self.text[index].set_animated(True)
-            
-            # move selected point 
-            self.selected_point.set_xdata(self.line.get_xdata()[index])
-            self.selected_point.set_ydata(self.line.get_ydata()[index])
-            
-            # draw everything on canvas except animated objects save as background
-            self.canvas.draw()
-            self.background = self.canvas.copy_from_bbox(self.axis.bbox)
-            
-            # now redraw just the line and text and selected point
-            self.axis.draw_artist(self.line)
-            self.axis.draw_artist(self.selected_point)
-            if self.text is not None:
-                self.axis.draw_artist(self.text[index])
-            
-            # and blit just the redrawn area
-            self.canvas.blit(self.axis.bbox)
+            self.start_drag(index)
+    
+    def start_drag(self, index):
+        ''' picks up the index'th point to be dragged, in this and any linked view '''
+        # We've picked this point, lock all others (on every canvas with a view
+        # of it - the lock only passes on events in this DragPlot's axis)
+        for view in self.views:
+            view.dispatcher.lock = self
+        
+        # every line is animated before any background is drawn, so views sharing
+        # a canvas are all left out of it
+        for view in self.views:
+            view.pick_up(index)
+        for view in self.views:
+            view.draw_background()
+        for view in self.views:
+            view.draw_picked_up()
+    
+    def pick_up(self, index):
+        ''' selects the index'th point, taking the line out of normal drawing '''
+        self.index = index
+        # draw everything but the selected line & text label and store it in pixel buffer
+        self.line.set_animated(True)
+        # move selected point (and the part of the line being dragged)
+        self.update_drag_artists()
+    
+    def draw_picked_up(self):
+        ''' draws the line and labels, without the selected point, over the
+            background and keeps that as the background to drag over '''
+        index = self.index
+        if self.text is not None:
+            self.label_artist(index).set_animated(True)
+        # add the line and labels with the selected point cut out of them, from
+        # here on only the drag line needs drawing - however many points the line has
+        self.draw_line_without_point(index)
+        self.draw_labels()
+        self.background = self.canvas.copy_from_bbox(self.axis.bbox)
+        
+        # now redraw just the dragged part of the line and text and selected point
+        self.redraw_drag(restore=False)
 
     def on_motion(self, event):
         # on motion we will move the line (and text) if the mouse is over us
         if event.inaxes != self.axis: return
         if self.index is None: return
-        if DragPlot.lock is not self: return
+        if self.dispatcher.lock is not self: return
         
-        # index of selected point
-        i = self.index
+        # keep only the newest motion
+        self.motion_stats['received'] += 1
+        waiting = self.pending_motion is not None
+        if waiting:
+            self.motion_stats['dropped'] += 1
+        self.pending_motion = (event.xdata, event.ydata)
         
-        # move selected point
-        self.move_point(event.xdata, event.ydata)
+        # too soon after the last frame - draw when the next frame is due
+        if self.max_fps is not None:
+            wait = self.last_frame + 1./self.max_fps - time.time()
+            if wait > 0:
+                if not waiting:
+                    self.frame_timer.interval = max(1, int(1000*wait))
+                    self.frame_timer.start()
+                return
+        self.draw_motion()
+    
+    def draw_motion(self):
+        ''' moves the selected point to the pending mouse position and draws it '''
+        if self.index is None or self.pending_motion is None: return
         
-        # restore the background region
-        self.canvas.restore_region(self.background)
-
-        # redraw just the current line and text label
-        self.fig.draw_artist(self.line)
-        if self.text is not None:
-            self.fig.draw_artist(self.text[i])
-        self.fig.draw_artist(self.selected_point)
-
-        # blit just the redrawn area
-        self.canvas.blit(self.axis.bbox)
+        # move selected point, and redraw it here and in any linked views
+        x, y = self.pending_motion
+        self.pending_motion = None
+        self.move_point(x, y)
+        self.redraw_drag()
+        for view in self.linked_views():
+            view.follow()
+        self.last_frame = time.time()
+        self.motion_stats['drawn'] += 1
+        for subscription in self.view_subscriptions():
+            if subscription.rate == 'frame':
+                subscription.deliver()
         
     def on_release(self, event):
         # Make sure DragPlot was locked to self
         if event.inaxes != self.axis: return
-        if DragPlot.lock is not self: return
+        if self.dispatcher.lock is not self: return
+        
+        # a motion still waiting for its frame is the final position - apply it now
+        if self.frame_timer is not None:
+            self.frame_timer.stop()
+        if self.pending_motion is not None and self.index is not None:
+            x, y = self.pending_motion
+            self.pending_motion = None
+            self.move_point(x, y)
+        if self.index is not None:
+            self.settle_point()
+        
+        # let go of the point in every view, and unlock
+        for view in self.views:
+            if view is not self and view.index is not None:
+                view.catch_up()
+            view.put_down()
+            view.dispatcher.lock = None
+        
+        # the point has stopped - send every subscription what's left
+        for subscription in self.view_subscriptions():
+            subscription.deliver()
         
+    def set_xdata(self, x):
+        old_x, old_y = self.data_copy()
+        super(DragPlot, self).set_xdata(x)
+        # linked views keep sharing the new data
+        for view in self.linked_views():
+            super(DragPlot, view).set_xdata(self.line.get_xdata())
+        self.log_changes(old_x, old_y)
+        
+    def set_ydata(self, y):
+        old_x, old_y = self.data_copy()
+        super(DragPlot, self).set_ydata(y)
+        for view in self.linked_views():
+            super(DragPlot, view).set_ydata(self.line.get_ydata())
+        self.log_changes(old_x, old_y)
+    
+    def set_point(self, i, x, y):
+        if not self.view_subscriptions():
+            return super(DragPlot, self).set_point(i, x, y)
+        old = [[self.line.get_xdata()[i], self.line.get_ydata()[i]]]
+        super(DragPlot, self).set_point(i, x, y)
+        self.log_change([i], old)
+    
+    def data_copy(self):
+        ''' copy of the x, y data (None, None if nobody is subscribed to changes) '''
+        if not self.view_subscriptions():
+            return None, None
+        return (np.array(self.line.get_xdata(), dtype=float),
+                np.array(self.line.get_ydata(), dtype=float))
+    
+    def log_changes(self, old_x, old_y):
+        ''' logs the points that differ from old_x, old_y (copies from data_copy) '''
+        if old_x is None: return
+        x, y = self.data_copy()
+        if x.size != old_x.size or y.size != old_y.size:
+            # the points are new - they all changed, from nothing
+            indices = np.arange(min(x.size, y.size))
+            old = np.nan*np.ones((indices.size, 2))
+        else:
+            same = ((x == old_x) | (np.isnan(x) & np.isnan(old_x))) & \
+                   ((y == old_y) | (np.isnan(y) & np.isnan(old_y)))
+            indices = np.flatnonzero(~same)
+            old = np.column_stack((old_x[indices], old_y[indices]))
+        if indices.size:
+            self.log_change(indices, old)
+    
+    def log_change(self, indices, old):
+        ''' adds the change of the points at indices (from old x, y values) to
+            the logs of the subscriptions to this and every linked view - sent
+            straight away unless a point is being dragged '''
+        xdata = self.line.get_xdata()
+        ydata = self.line.get_ydata()
+        new = np.column_stack((np.take(xdata, indices), np.take(ydata, indices)))
+        for view in self.views:
+            for subscription in view.subscriptions:
+                subscription.log.add(indices, old, new)
+                subscription.changed(view.index is not None)
+        
+    def redraw_drag(self, restore=True):
+        ''' draws just the dragged part of the line, its label and the selected
+            point over the background, and blits the axis '''
+        # restore the background region
+        if restore:
+            self.canvas.restore_region(self.background)
+        
+        # redraw just the dragged part of the line and text label
+        self.fig.draw_artist(self.drag_line)
+        if self.text is not None:
+            self.fig.draw_artist(self.label_artist(self.index))
+        self.fig.draw_artist(self.selected_point)
+        
+        # blit just the redrawn area
+        self.canvas.blit(self.axis.bbox)
+    
+    def put_down(self):
+        ''' lets go of the selected point, putting the line back into normal drawing '''
         # turn off the animation property
-        self.line.set_animated(False)    
+        self.line.set_animated(False)
         
         # restore the background region
         self.canvas.restore_region(self.background)
         
-        # draw lines / texts etc...
-        self.fig.draw_artist(self.line)
+        # draw lines / texts etc... (the background already has the rest of the line)
+        self.fig.draw_artist(self.drag_line)
         if self.text is not None and self.index is not None:
-            self.text[self.index].set_animated(False)
-            self.fig.draw_artist(self.text[self.index])
+            self.label_artist(self.index).set_animated(False)
+            self.fig.draw_artist(self.label_artist(self.index))
         
         # blit just the redrawn area
         self.canvas.blit(self.axis.bbox)
         
-        # reset data and unlock
+        # reset data
         self.index = None
         self.background = None
-        DragPlot.lock = None
-        
+    
+    def catch_up(self):
+        ''' moves the label, grid and drag artists to the selected point after it
+            has been moved (in the shared data) by a linked view - which has
+            already logged the change for this view's subscriptions '''
+        i = self.index
+        super(DragPlot, self).set_point(i, self.line.get_xdata()[i], self.line.get_ydata()[i])
+        self.update_drag_artists()
+    
+    def follow(self):
+        ''' redraws the selected point after a linked view has moved it '''
+        self.catch_up()
+        self.redraw_drag()
+    
     def move_point(self, new_x, new_y):
         ''' moves the selected point (indexed by self.index) to new coordinates '''
-        xdata = self.line.get_xdata() # get_xdata().copy() had to be used in past
-        ydata = self.line.get_ydata()
-        
         # change the i'th x,y point
         i = self.index
-        xdata[i] = new_x
-        ydata[i] = new_y
-        self.set_xdata(xdata)
-        self.set_ydata(ydata)
+        self.set_point(i, new_x, new_y)
         
         # change the location of the select marker
-        self.selected_point.set_xdata(self.line.get_xdata()[i])
-        self.selected_point.set_ydata(self.line.get_ydata()[i])
+        self.update_drag_artists()
+    
+    def settle_point(self):
+        ''' called when the selected point is released, before it is drawn -
+            a place for subclasses to make final adjustments to it '''
+        pass
+    
+    def update_drag_artists(self):
+        ''' moves the select marker and drag line to the selected point - this
+            only looks at the selected point and its neighbours '''
+        i = self.index
+        xdata = self.line.get_xdata()
+        ydata = self.line.get_ydata()
+        self.selected_point.set_xdata(xdata[i])
+        self.selected_point.set_ydata(ydata[i])
+        
+        # selected point with the line segments either side of it, but only the
+        # selected point's marker (the neighbours' are already in the background)
+        lo, hi = max(i-1, 0), min(i+2, len(xdata))
+        self.drag_line.set_data(np.array(xdata[lo:hi], dtype=float),
+                                np.array(ydata[lo:hi], dtype=float))
+        self.drag_line.set_markevery([i-lo])
+    
+    def draw_background(self):
+        ''' draws the axis without this line or its labels, reusing the background
+            from the last drag if nothing in the figure has changed since '''
+        background = DragPlot.backgrounds.get(self.axis, self)
+        if background is not None:
+            self.canvas.restore_region(background)
+            return
+        
+        # draw everything on canvas except animated objects, with the labels
+        # animated too so they can be drawn over the background on every press
+        # (those of linked views on this canvas as well, which get their
+        # backgrounds from the same draw)
+        views = [view for view in self.views if view.canvas is self.canvas]
+        labels = [t for view in views for t in view.label_artists()]
+        for t in labels:
+            t.set_animated(True)
+        self.canvas.draw()
+        for t in labels:
+            t.set_animated(False)
+        for view in views:
+            if view is self or DragPlot.backgrounds.get(view.axis, view) is None:
+                background = self.canvas.copy_from_bbox(view.axis.bbox)
+                DragPlot.backgrounds.store(view.axis, view, background)
+    
+    def draw_labels(self):
+        ''' draws the labels, except any animated ones '''
+        for t in self.label_artists():
+            if not t.get_animated():
+                self.axis.draw_artist(t)
+    
+    def draw_line_without_point(self, i):
+        ''' draws the line with its i'th point (and the segments to it) left out '''
+        xdata = self.line.get_xdata()
+        ydata = self.line.get_ydata()
+        x = np.array(xdata, dtype=float)
+        x[i] = np.nan
+        self.line.set_data(x, ydata)
+        self.axis.draw_artist(self.line)
+        self.line.set_data(xdata, ydata)
         
     def make_selected_point(self):
         ''' Highlight for the selected data point
@@ -144,6 +442,16 @@ class DragPlot(ClickPlot, object):  # object is there so that the super() call i
                             markersize=size, alpha=0.4,
                             color=color, animated=True)
         return point
+    
+    def make_drag_line(self):
+        ''' A copy of the style of line, used to draw just the part of line that
+            is being dragged - animated=True keeps it out of normal drawing '''
+        drag_line = Line2D([], [])
+        drag_line.update_from(self.line)
+        drag_line.set_figure(self.fig)
+        drag_line.axes = self.axis
+        drag_line.set_animated(True)
+        return drag_line
 
 
 if __name__ == '__main__':
@@ -1,37 +1,127 @@
 from drag_plot import DragPlot
+from spatial_index import SegmentIndex
+from root_finding import nearest_roots
+from function_adapter import adapt_function
+
+import numpy as np
 
 class DragRoot(DragPlot):
     ''' Similar to DragPlot, but when points are dragged they remain fixed to 
-        the function being studied '''
+        the function being studied 
+        
+        With lookup=True the function is evaluated once at lookup_points x values
+        across the axis, and dragged points follow a linear interpolation of
+        those - the function itself is only evaluated for where the point is
+        released. The table is made again when the axis limits change
+        
+        With projection=True a dragged point goes to the point of the curve
+        closest to the mouse (in axis-normalised distance) rather than straight
+        above / below it, so it follows the mouse along steep parts of the curve.
+        The curve is the lookup table (made whether or not lookup is set), and
+        the point is put exactly onto root_function when it is released
+        
+        With snap_to_root=True a released point moves to the nearest zero of
+        root_function - roots are bracketed by sign changes in the lookup table
+        and refined together, see snap_roots() '''
+    
+    timed_methods = DragPlot.timed_methods + ('root_function',)
     
-    def __init__(self, line, root_function, label=None, select_radius=0.03):
+    def __init__(self, line, root_function, label=None, select_radius=0.03,
+                 spatial_index=False, label_mode='text', max_fps=None,
+                 lookup=False, lookup_points=2000, projection=False, snap_to_root=False,
+                 max_labels=200):
         self.root_function = root_function
-        super(DragRoot, self).__init__(line, label=label, select_radius=select_radius)
+        self.lookup = lookup                # interpolate root_function while dragging
+        self.lookup_points = lookup_points  # number of x values in the lookup table
+        self.projection = projection        # follow the mouse along the curve
+        self.snap_to_root = snap_to_root    # released points go to the nearest root
+        self.table = None                   # (axis limits, x, root_function(x), SegmentIndex)
+        super(DragRoot, self).__init__(line, label=label, select_radius=select_radius,
+                                       spatial_index=spatial_index, label_mode=label_mode,
+                                       max_labels=max_labels, max_fps=max_fps)
         
     def move_point(self, new_x, new_y):
         # moves the selected point (indexed by self.index) to new coordinates
-        xdata = self.line.get_xdata() # get_xdata().copy() had to be used in past
-        ydata = self.line.get_ydata()
-        
         # change the i'th x,y point
-        f = self.root_function
         i = self.index
-        xdata[i] = new_x
-        ydata[i] = f(new_x)
-        # if y point is out of axis range, limit it to the the top of the axis
-        axis_min, axis_max = self.axis.get_ylim()
-        y = ydata[i]
+        if self.projection:
+            (xlim, ylim), table_x, table_y, curve = self.lookup_table()
+            new_x, y, distance = curve.closest(new_x, new_y, xlim[1]-xlim[0], ylim[1]-ylim[0])
+        elif self.lookup:
+            (xlim, ylim), table_x, table_y, curve = self.lookup_table()
+            y = np.interp(new_x, table_x, table_y)
+        else:
+            ylim = self.axis.get_ylim()
+            y = self.root_function(new_x)
+        self.set_point(i, new_x, self.clip_to_axis(y, ylim))
+        
+        # change the location of the select marker
+        self.update_drag_artists()
+    
+    def settle_point(self):
+        ''' the released point goes exactly onto root_function (or its nearest root) '''
+        i = self.index
+        if self.snap_to_root:
+            root = self.find_roots(self.line.get_xdata()[i])[0]
+            if np.isfinite(root):
+                self.set_point(i, root, self.clip_to_axis(0, self.axis.get_ylim()))
+                self.update_drag_artists()
+                return
+        if not (self.lookup or self.projection): return
+        x = self.line.get_xdata()[i]
+        y = self.clip_to_axis(self.root_function(x), self.axis.get_ylim())
+        self.set_point(i, x, y)
+        self.update_drag_artists()
+    
+    def clip_to_axis(self, y, ylim):
+        ''' if y point is out of axis range, limit it to the the top of the axis '''
+        axis_min, axis_max = ylim
         if y > axis_max:
-            ydata[i] = axis_max
+            y = axis_max
         if y < axis_min:
-            ydata[i] = axis_min
+            y = axis_min
+        return y
+    
+    def lookup_table(self):
+        ''' x values across the axis and root_function at them, made again
+            if the axis limits have changed '''
+        limits = (self.axis.get_xlim(), self.axis.get_ylim())
+        if self.table is None or self.table[0] != limits:
+            x_min, x_max = limits[0]
+            x = np.linspace(min(x_min, x_max), max(x_min, x_max), self.lookup_points)
+            y = self.evaluate(x)
+            # segments of the curve, for finding the closest point on it
+            curve = SegmentIndex(x, y) if self.projection else None
+            self.table = (limits, x, y, curve)
+        return self.table
+    
+    def evaluate(self, x):
+        ''' root_function on an array of x values (as arrays or one value at a
+            time, whichever root_function works with - see FunctionAdapter) '''
+        return adapt_function(self.root_function)(x)
+    
+    def find_roots(self, x):
+        ''' the roots of root_function nearest to each of x (nan if there are
+            none in the x-range of the axis) - found together, in one batch '''
+        limits, table_x, table_y, curve = self.lookup_table()
+        return nearest_roots(self.evaluate, x, table_x, table_y)
+    
+    def snap_roots(self, indices=None):
+        ''' moves the points (all of them, or those at indices) onto the roots
+            of root_function closest to them, eg. after zooming. Points with
+            no root nearby are left where they are '''
+        xdata = np.array(self.line.get_xdata(), dtype=float)
+        ydata = np.array(self.line.get_ydata(), dtype=float)
+        if indices is None:
+            indices = np.arange(xdata.size)
+        indices = np.asarray(indices, dtype=int)
+        roots = self.find_roots(xdata[indices])
+        found = np.isfinite(roots)
+        xdata[indices[found]] = roots[found]
+        ydata[indices[found]] = 0
         self.set_xdata(xdata)
         self.set_ydata(ydata)
         
-        # change the location of the select marker
-        self.selected_point.set_xdata(self.line.get_xdata()[i])
-        self.selected_point.set_ydata(self.line.get_ydata()[i])
-        
 
 if __name__ == '__main__':
     ''' show DragPoint  in use with closest click on a skewed axis '''
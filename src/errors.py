@@ -8,4 +8,8 @@ class BadLabelInput(Exception): pass
 class NotAList(Exception): pass
 class NotAFunction(Exception): pass
 class NotAnAxis(Exception): pass
-class BadZoomScale(Exception): pass
\ No newline at end of file
+class BadZoomScale(Exception): pass
+class BadSamplingInput(Exception): pass
+class BadDecimationInput(Exception): pass
+class BadEvaluationInput(Exception): pass
+class BadRateInput(Exception): pass
\ No newline at end of file
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+
+import numpy as np
+
+class EvaluationCache:
+    ''' Keeps evaluations of a function f so zooming back and forth or panning
+        doesn't evaluate f at the same x values again
+
+        x values are taken from fixed grids with spacings of 2**level, so a view
+        of any range lines up with samples made for earlier views at the same
+        level. Each grid is cut into tiles of tile_size samples, and f values
+        are stored per (level, tile) - only those inside a requested range are
+        evaluated, so a tile fills up as views overlap it. When the stored tiles
+        go over max_bytes the least recently used ones are dropped '''
+
+    tile_size = 256     # samples per tile
+
+    def __init__(self, f, max_bytes=64*2**20, tile_size=None):
+        self.f = f
+        self.max_bytes = max_bytes
+        if tile_size is not None:
+            self.tile_size = max(1, int(tile_size))
+        self.tiles = OrderedDict()  # (level, tile) -> (f values, evaluated?), oldest used first
+        self.hits = 0               # tiles found in the cache
+        self.misses = 0             # tiles which weren't
+        self.evaluations = 0        # x values f has been evaluated at
+
+    def clear(self):
+        ''' forget all stored evaluations - eg. when f has changed '''
+        self.tiles.clear()
+
+    def sample(self, x_min, x_max, Npoints):
+        ''' x values from x_min to x_max - the ends and the grid points between
+            them, with a spacing of at most (x_max-x_min)/(Npoints-1) - and f at
+            those x. f is only evaluated inside the range '''
+        if x_max < x_min:
+            x, y = self.sample(x_max, x_min, Npoints)
+            return x[::-1], y[::-1]
+        spacing = (x_max-x_min)/float(max(Npoints-1, 1))
+        level = int(np.floor(np.log2(spacing))) if spacing > 0 else 0
+        spacing = 2.**level
+        first = int(np.ceil(x_min/spacing))
+        last = int(np.floor(x_max/spacing))
+
+        # grid points of each tile in the range which haven't been evaluated
+        T = self.tile_size
+        tiles = range(first//T, last//T+1) if last >= first else []
+        missing = []
+        for tile in tiles:
+            if (level, tile) in self.tiles:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self.tiles[(level, tile)] = (np.empty(T), np.zeros(T, dtype=bool))
+            known = self.tiles[(level, tile)][1]
+            lo, hi = max(first-tile*T, 0), min(last-tile*T, T-1)
+            missing.append(tile*T + lo + np.flatnonzero(~known[lo:hi+1]))
+        missing = np.concatenate(missing) if missing else np.array([], dtype=int)
+
+        # the ends of the range, if they aren't grid points
+        start = [x_min] if first*spacing != x_min else []
+        end = [x_max] if last*spacing != x_max and x_max != x_min else []
+
+        # evaluate the missing grid points and the ends in one call of f
+        x_new = np.concatenate((missing*spacing, start, end))
+        y_new = np.asarray(self.f(x_new), dtype=float)*np.ones(x_new.size) if x_new.size \
+                else np.array([])
+        self.evaluations += x_new.size
+        for k, y_k in zip(missing, y_new):
+            y_tile, known = self.tiles[(level, k//T)]
+            y_tile[k % T] = y_k
+            known[k % T] = True
+
+        # mark tiles as recently used, and put the view together
+        y = [y_new[missing.size:missing.size+len(start)]]
+        for tile in tiles:
+            entry = self.tiles.pop((level, tile))
+            self.tiles[(level, tile)] = entry
+            lo, hi = max(first-tile*T, 0), min(last-tile*T, T-1)
+            y.append(entry[0][lo:hi+1])
+        y.append(y_new[missing.size+len(start):])
+        y = np.concatenate(y)
+        x = np.concatenate((start, np.arange(first, last+1)*spacing, end))
+
+        # drop the least recently used tiles over the memory limit
+        max_tiles = max(len(tiles), self.max_bytes//(9*T))
+        while len(self.tiles) > max_tiles:
+            self.tiles.popitem(last=False)
+        return x, y
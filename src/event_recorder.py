@@ -0,0 +1,187 @@
+import time
+import numpy as np
+from matplotlib.backend_bases import MouseEvent, KeyEvent, TimerBase
+
+# one row per mouse / key event - kept small so long sessions make small files
+EVENT_DTYPE = np.dtype([('time', 'f8'),     # seconds since the first event
+                        ('kind', 'u1'),     # index into EVENT_NAMES
+                        ('axis', 'i2'),     # index of the axis in fig.axes, -1 if none
+                        ('xdata', 'f8'),    # data coordinates in that axis
+                        ('ydata', 'f8'),
+                        ('x', 'f4'),        # pixel coordinates on the canvas
+                        ('y', 'f4'),
+                        ('button', 'i1'),   # 0 if no button
+                        ('step', 'f4'),     # scroll steps
+                        ('dblclick', '?'),
+                        ('key', 'U24')])    # key pressed (or held, eg. 'shift'), '' if none
+
+EVENT_NAMES = ['button_press_event', 'motion_notify_event',
+               'button_release_event', 'scroll_event',
+               'key_press_event', 'key_release_event']
+
+class EventRecorder:
+    ''' Records the mouse and key events of a figure, so an interactive session
+        (eg. a slow drag in DragPlot or zoom in ZoomPlot) can be saved and
+        replayed later with EventReplayer
+
+        Positions are stored in the data coordinates of the axis the mouse was
+        over, as well as in pixels, so a recording replays the same way on a
+        figure of a different size '''
+
+    def __init__(self, fig, start=True):
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.rows = []      # recorded events, as tuples of EVENT_DTYPE
+        self.t0 = None      # time of the first event
+        self.cids = None
+        if start:
+            self.start()
+
+    def start(self):
+        ''' start recording events '''
+        if self.cids is not None: return
+        self.cids = [self.canvas.mpl_connect(name, self.on_event) for name in EVENT_NAMES]
+
+    def stop(self):
+        ''' stop recording events - the ones recorded are kept '''
+        if self.cids is None: return
+        for cid in self.cids:
+            self.canvas.mpl_disconnect(cid)
+        self.cids = None
+
+    def on_event(self, event):
+        now = time.time()
+        if self.t0 is None:
+            self.t0 = now
+        axis = -1
+        xdata = ydata = np.nan
+        if event.inaxes is not None and event.inaxes in self.fig.axes:
+            axis = self.fig.axes.index(event.inaxes)
+            xdata, ydata = event.xdata, event.ydata
+        # key events have no button, scroll step or double click
+        button = getattr(event, 'button', None)
+        button = button if isinstance(button, int) else 0
+        self.rows.append((now-self.t0, EVENT_NAMES.index(event.name), axis, xdata, ydata,
+                          event.x, event.y, button, getattr(event, 'step', 0),
+                          getattr(event, 'dblclick', False), event.key or u''))
+
+    @property
+    def events(self):
+        ''' the recorded events as a numpy record array '''
+        return np.array(self.rows, dtype=EVENT_DTYPE)
+
+    def save(self, filename):
+        ''' saves the recorded events to a .npy file '''
+        np.save(filename, self.events)
+
+class EventReplayer:
+    ''' Sends recorded mouse and key events (an EventRecorder, its events, or
+        the file it saved) to a figure, eg. one drawn with the Agg backend for
+        profiling
+
+        The events are replayed in order, at the recorded speed multiplied by
+        'speed' - or with speed=None one after the other as fast as possible.
+        Events over an axis are placed at the recorded data coordinates in the
+        axis of the same index.
+
+        The timers of a canvas without a GUI never go off by themselves, so
+        while replaying, those started (eg. ZoomPlot's re-sampling once zooming
+        stops) are fired here when they are due by the recorded times - and any
+        still waiting once the last event is sent, straight after it '''
+
+    def __init__(self, events, fig):
+        if isinstance(events, EventRecorder):
+            events = events.events
+        elif isinstance(events, basestring):
+            events = np.load(events)
+        self.events = self.sanitise_events(events)
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.timers = {}    # timers started while replaying -> recorded time they're due
+        self.now = 0.       # recorded time of the event being replayed
+
+    def sanitise_events(self, events):
+        ''' events as an EVENT_DTYPE array - fields missing from older
+            recordings (eg. key) are left empty '''
+        events = np.asarray(events)
+        if events.dtype.names is None or events.dtype == EVENT_DTYPE:
+            return np.asarray(events, dtype=EVENT_DTYPE)
+        sanitised = np.zeros(events.shape, dtype=EVENT_DTYPE)
+        for name in events.dtype.names:
+            sanitised[name] = events[name]
+        return sanitised
+
+    def __len__(self):
+        return self.events.size
+
+    def make_event(self, row):
+        ''' a MouseEvent / KeyEvent from a recorded row '''
+        x, y = float(row['x']), float(row['y'])
+        axis = int(row['axis'])
+        if 0 <= axis < len(self.fig.axes) and np.isfinite(row['xdata']):
+            x, y = self.fig.axes[axis].transData.transform((row['xdata'], row['ydata']))
+        name = EVENT_NAMES[row['kind']]
+        key = row['key'] or None
+        if name.startswith('key'):
+            return KeyEvent(name, self.canvas, key, x, y)
+        button = int(row['button']) or None
+        return MouseEvent(name, self.canvas, x, y, button=button, key=key,
+                          step=float(row['step']), dblclick=bool(row['dblclick']))
+
+    def replay(self, speed=1.):
+        ''' sends every event to the canvas, returning the time (seconds) each
+            took to handle - including the timers it started, fired before the
+            next event '''
+        handled = np.zeros(self.events.size)
+        start = time.time()
+        # catch the starting / stopping of timers that don't go off by themselves
+        timer_start, timer_stop = TimerBase.__dict__['_timer_start'], TimerBase.__dict__['_timer_stop']
+        TimerBase._timer_start = lambda timer: self.start_timer(timer)
+        TimerBase._timer_stop = lambda timer: self.timers.pop(timer, None)
+        try:
+            for i, row in enumerate(self.events):
+                t = time.time()
+                self.fire_timers(row['time'])
+                if i > 0:
+                    handled[i-1] += time.time() - t
+                if speed is not None:
+                    wait = start + row['time']/speed - time.time()
+                    if wait > 0:
+                        time.sleep(wait)
+                self.now = row['time']
+                event = self.make_event(row)
+                t = time.time()
+                self.canvas.callbacks.process(event.name, event)
+                handled[i] = time.time() - t
+            t = time.time()
+            self.fire_timers()
+            if handled.size:
+                handled[-1] += time.time() - t
+        finally:
+            TimerBase._timer_start, TimerBase._timer_stop = timer_start, timer_stop
+            self.timers.clear()
+        return handled
+
+    def start_timer(self, timer):
+        ''' a timer is started - it's due after its interval, in recorded time '''
+        self.timers[timer] = self.now + timer.interval/1000.
+
+    def fire_timers(self, until=None):
+        ''' fires the timers due by recorded time 'until', in the order they're
+            due - or with until=None, every waiting timer once '''
+        fired = set()
+        while True:
+            waiting = [(due, timer) for timer, due in self.timers.items()
+                       if until is not None or timer not in fired]
+            if not waiting:
+                return
+            due, timer = min(waiting, key=lambda item: item[0])
+            if until is not None and due > until:
+                return
+            del self.timers[timer]
+            fired.add(timer)
+            self.now = max(self.now, due)
+            timer._on_timer()
+            # repeating timers go again, unless they were stopped or restarted
+            if not timer.single_shot and timer.callbacks and timer not in self.timers:
+                self.timers[timer] = due + timer.interval/1000.
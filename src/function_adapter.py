@@ -0,0 +1,127 @@
+import weakref
+import numpy as np
+
+from errors import NotAFunction
+
+class FunctionAdapter:
+    ''' A function f of a single number, evaluated on arrays of x values in the
+        quickest way f allows. Calling f on an array of test values (or, if
+        that fails, on single test values) finds its kind:
+            'vector' - f works on numpy arrays, and is called on them directly
+            'scalar' - f only works on single numbers, and is called on each value
+            'partial' - f works on arrays, but not all of them (eg. it raises for
+                        some values) - x is evaluated in chunks, as arrays where
+                        that works and one value at a time where it doesn't
+        A 'vector' function which fails on an array becomes 'partial'.
+
+        Single values where f is undefined - raises an arithmetic or value error
+        (eg. 1/x at x=0, math.log(-1)) - are evaluated as nan. f may return any
+        kind of number (eg. complex). The adapter can be pickled (eg. for a
+        process pool) if f can '''
+
+    probe = np.array([0., 0.5, 1.5, 2.5])   # x values used to find the kind of f
+    chunk = 1024                            # x values per array call of a 'partial' f
+
+    def __init__(self, f, kind=None):
+        self.f = f
+        self.kind = kind or self.detect()
+
+    def value(self, x):
+        ''' f at a single number, nan if f is undefined there '''
+        try:
+            return self.f(x)
+        except (ArithmeticError, ValueError):
+            return np.nan
+
+    def detect(self):
+        ''' the kind of f - raises NotAFunction if it doesn't work on numbers '''
+        try:
+            with np.errstate(all='ignore'):
+                y = np.asarray(self.f(self.probe.copy()))*np.ones(self.probe.size)
+        except Exception:
+            y = None
+        if y is not None and numeric(y):
+            return 'vector'
+
+        # only single numbers then - the first test value f is defined at tells
+        for x in self.probe:
+            try:
+                y = self.f(x)
+            except (ArithmeticError, ValueError):
+                continue    # can't tell what f is here
+            except Exception:
+                break
+            if numeric(y):
+                return 'scalar'
+            break
+        else:
+            return 'scalar'
+        raise NotAFunction, "f needs to operate on numbers eg. f(4)"
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=float)
+        flat = x.ravel()
+        if self.kind == 'vector':
+            try:
+                y = np.asarray(self.f(flat))*np.ones(flat.size)
+            except Exception:
+                self.kind = 'partial'
+                remember_kind(self.f, self.kind)
+                y = self.evaluate_chunks(flat)
+        elif self.kind == 'partial':
+            y = self.evaluate_chunks(flat)
+        else:
+            y = self.evaluate_scalars(flat)
+        return y.reshape(x.shape) if x.ndim else y[0]
+
+    def evaluate_scalars(self, x):
+        ''' f at each value of x, one at a time '''
+        if x.size == 0:
+            return np.array([])
+        return np.array(np.frompyfunc(self.value, 1, 1)(x).tolist())*np.ones(x.size)
+
+    def evaluate_chunks(self, x):
+        ''' f on chunks of x - each chunk as an array if f manages it, else one value at a time '''
+        y = [np.array([])]
+        for start in range(0, x.size, self.chunk):
+            chunk = x[start:start+self.chunk]
+            try:
+                y.append(np.asarray(self.f(chunk))*np.ones(chunk.size))
+            except Exception:
+                y.append(self.evaluate_scalars(chunk))
+        return np.concatenate(y)
+
+def numeric(y):
+    ''' whether y is a number or an array of them (bool, int, float or complex) '''
+    return np.asarray(y).dtype.kind in 'biufc'
+
+# kinds of the functions adapted so far, so each function is only checked once
+kinds = weakref.WeakKeyDictionary()
+lasting_kinds = {}      # for functions that can't be weakly referenced (eg. built in)
+
+def known_kind(f):
+    ''' the kind of f found before, or None '''
+    for store in (kinds, lasting_kinds):
+        try:
+            return store.get(f)
+        except TypeError:
+            continue    # not weakly referenceable / hashable
+    return None
+
+def remember_kind(f, kind):
+    for store in (kinds, lasting_kinds):
+        try:
+            store[f] = kind
+            return
+        except TypeError:
+            continue
+
+def adapt_function(f):
+    ''' a FunctionAdapter of f - only checking what kind f is the first time '''
+    if isinstance(f, FunctionAdapter):
+        return f
+    kind = known_kind(f)
+    adapter = FunctionAdapter(f, kind)
+    if kind is None:
+        remember_kind(f, adapter.kind)
+    return adapter
@@ -0,0 +1,126 @@
+import time
+import weakref
+import numpy as np
+
+class InteractionStats:
+    ''' Timings of the steps of an interaction (handling a mouse event, finding
+        the closest point, evaluating f, drawing / blitting the canvas...)
+
+        The times of each named step are kept as a histogram with logarithmic
+        bins, so memory use doesn't grow however long the figure is used. Each
+        callback added with add_callback is called as callback(name, seconds)
+        for every recorded time '''
+
+    # bin edges in seconds - 10 per decade from 1 microsecond to 100 seconds
+    edges = 10**np.linspace(-6, 2, 81)
+
+    def __init__(self):
+        self.callbacks = []
+        self.canvases = weakref.WeakKeyDictionary()    # canvases being watched
+        self.reset()
+
+    def reset(self):
+        ''' forget all recorded times '''
+        self.histograms = {}    # name -> counts per bin (first/last - below/above edges)
+        self.totals = {}        # name -> total seconds
+        self.maxima = {}        # name -> longest time
+
+    def record(self, name, seconds):
+        ''' adds one time of the step called name '''
+        if name not in self.histograms:
+            self.histograms[name] = np.zeros(self.edges.size+1, dtype=int)
+            self.totals[name] = 0.
+            self.maxima[name] = 0.
+        self.histograms[name][np.searchsorted(self.edges, seconds)] += 1
+        self.totals[name] += seconds
+        self.maxima[name] = max(self.maxima[name], seconds)
+        for callback in self.callbacks:
+            callback(name, seconds)
+
+    def add_callback(self, callback):
+        ''' callback(name, seconds) is called with every recorded time '''
+        self.callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
+
+    def timed(self, name, func):
+        ''' func, with the time of every call recorded as name '''
+        def timed_func(*args, **kwargs):
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, time.time()-start)
+        timed_func.__name__ = getattr(func, '__name__', name)
+        timed_func.__doc__ = getattr(func, '__doc__', None)
+        return timed_func
+
+    def watch_canvas(self, canvas):
+        ''' records the full draws ('draw') and blits ('blit') of canvas '''
+        if canvas in self.canvases: return
+        self.canvases[canvas] = True
+        canvas.draw = self.timed('draw', canvas.draw)
+        canvas.blit = self.timed('blit', canvas.blit)
+
+    def names(self):
+        ''' names of the steps with recorded times '''
+        return sorted(self.histograms)
+
+    def count(self, name):
+        ''' number of times the step was recorded (eg. count('blit')) '''
+        if name not in self.histograms: return 0
+        return int(self.histograms[name].sum())
+
+    def mean(self, name):
+        ''' mean time of the step in seconds '''
+        count = self.count(name)
+        return self.totals[name]/count if count else np.nan
+
+    def percentile(self, name, q):
+        ''' time in seconds that q percent of the step's times are at most -
+            to the resolution of the histogram (the upper edge of a bin) '''
+        count = self.count(name)
+        if count == 0: return np.nan
+        cumulative = np.cumsum(self.histograms[name])
+        bin = np.searchsorted(cumulative, q/100.*count)
+        if bin >= self.edges.size:
+            return self.maxima[name]
+        return min(self.edges[bin], self.maxima[name])
+
+    def histogram(self, name):
+        ''' counts of the step's times between the bin edges (seconds) - counts
+            has one more value at each end, for times below / above the edges '''
+        if name not in self.histograms:
+            return np.zeros(self.edges.size+1, dtype=int), self.edges
+        return self.histograms[name].copy(), self.edges
+
+    def summary(self):
+        ''' {name: {'count', 'total', 'mean', 'p50', 'p99', 'max'}} for every step '''
+        return dict((name, {'count': self.count(name),
+                            'total': self.totals[name],
+                            'mean': self.mean(name),
+                            'p50': self.percentile(name, 50),
+                            'p99': self.percentile(name, 99),
+                            'max': self.maxima[name]})
+                    for name in self.names())
+
+class Instrumented:
+    ''' Class with a method to time a plot's methods (those named in timed_methods)
+        and the drawing of its canvas - nothing is timed until instrument() is
+        called, so there's no cost otherwise '''
+
+    timed_methods = ()  # names of the methods / function attributes to time
+    stats = None        # InteractionStats once instrumented
+
+    def instrument(self, stats=None):
+        ''' starts recording timings into stats (a new InteractionStats if None,
+            or one shared with other plots), and returns it '''
+        if self.stats is not None:
+            return self.stats
+        self.stats = stats if stats is not None else InteractionStats()
+        for name in self.timed_methods:
+            setattr(self, name, self.stats.timed(name, getattr(self, name)))
+        self.stats.watch_canvas(self.canvas)
+        return self.stats
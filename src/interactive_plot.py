@@ -7,9 +7,44 @@
     from drag_root import DragRoot
     
     with this interactive_plot.py file, we can now use the following in our code
-    from interactive_plot import ClickPlot, DragRoot '''
+    from interactive_plot import ClickPlot, DragRoot
+    
+    The classes are only imported when they are first used, so importing this
+    file doesn't import every module (or matplotlib.pyplot, which picks a GUI
+    backend) - eg. for scripts rendering figures without a display '''
+
+import sys
+import types
+from importlib import import_module
+
+# the module each class is in
+modules = {'ClickPlot': 'click_plot',
+           'DragPlot': 'drag_plot',
+           'DragRoot': 'drag_root',
+           'ZoomPlot': 'zoom_plot',
+           'DataZoomPlot': 'data_zoom_plot',
+           'MultiZoomPlot': 'multi_zoom_plot',
+           'EventRecorder': 'event_recorder',
+           'EventReplayer': 'event_recorder',
+           'InteractionStats': 'instrumentation'}
+
+__all__ = sorted(modules)
+
+class LazyModule(types.ModuleType):
+    ''' Stands in for this module, importing each class the first time it is used '''
+
+    def __getattr__(self, name):
+        if name not in modules:
+            raise AttributeError, "module %s has no attribute %s" % (self.__name__, name)
+        value = getattr(import_module(modules[name]), name)
+        setattr(self, name, value)  # only looked up once
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(modules))
 
-from click_plot import ClickPlot
-from drag_plot import DragPlot
-from drag_root import DragRoot
-from zoom_plot import ZoomPlot
\ No newline at end of file
+lazy_module = LazyModule(__name__, __doc__)
+lazy_module.__dict__.update(dict((k, v) for k, v in globals().items() if k != '__doc__'))
+# python 2 clears a module's globals when it is garbage collected - keep it alive
+lazy_module.original_module = sys.modules[__name__]
+sys.modules[__name__] = lazy_module
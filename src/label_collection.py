@@ -0,0 +1,125 @@
+import numpy as np
+
+from matplotlib.artist import Artist
+from matplotlib.text import Text
+from matplotlib.textpath import TextPath
+from matplotlib.colors import colorConverter
+from matplotlib.transforms import Affine2D, IdentityTransform
+
+class LabelCollection(Artist):
+    ''' A single artist holding a text label for every data point of a line
+
+        Instead of one matplotlib Text per label, the label positions are kept
+        in x/y offset arrays - moving all the labels is an array assignment.
+        Each distinct label is turned into a glyph path once (a TextPath), and
+        drawing transforms every offset to the screen in one go, leaves out the
+        labels off the canvas and draws the rest with a single path collection
+        call of the renderer - there is no text layout per label.
+
+        single(i) gives a stand alone Text for the i'th label, while that Text
+        is animated (eg. the label is being dragged) the collection leaves the
+        i'th label out of its own drawing '''
+
+    zorder = 3  # same as matplotlib Text
+
+    def __init__(self, axis, x, y, labels, transform, size=20):
+        Artist.__init__(self)
+        self.x = np.array(x, dtype=float)   # label offsets in data coordinates
+        self.y = np.array(y, dtype=float)
+        self.labels = labels
+        self.text_transform = transform     # data coords -> shifted label position
+
+        # the Text whose font and color every label is drawn with
+        self.stamp = Text(0, 0, '', size=size)
+        self.stamp.set_transform(IdentityTransform())
+        self.stamp.set_figure(axis.figure)
+        self.paths = {}     # label text -> (glyph path in points, its extents)
+
+        # stand alone Text for a single label, see single()
+        self.single_index = None
+        self.single_text = Text(0, 0, '', size=size)
+        self.single_text.set_transform(transform)
+        self.single_text.set_figure(axis.figure)
+
+        axis.add_artist(self)
+
+    def set_xoffsets(self, x):
+        ''' moves every label to new x data coordinates '''
+        self.x[:] = x
+        self.sync_single()
+        self.stale = True
+
+    def set_yoffsets(self, y):
+        ''' moves every label to new y data coordinates '''
+        self.y[:] = y
+        self.sync_single()
+        self.stale = True
+
+    def set_offset(self, i, x, y):
+        ''' moves the i'th label to x,y data coordinates '''
+        self.x[i] = x
+        self.y[i] = y
+        if i == self.single_index:
+            self.sync_single()
+        else:
+            self.stale = True
+
+    def single(self, i):
+        ''' a Text for just the i'th label which follows that label's offset '''
+        if i != self.single_index:
+            self.single_text.set_animated(False)
+            self.single_index = i
+            self.single_text.set_text(self.labels[i])
+            self.sync_single()
+        return self.single_text
+
+    def sync_single(self):
+        ''' keeps the single label Text at its label's offset '''
+        i = self.single_index
+        if i is not None:
+            self.single_text.set_position((self.x[i], self.y[i]))
+
+    def label_path(self, label):
+        ''' the glyph path (in points, from the label's anchor) of a label and
+            its extents (x0, y0, x1, y1) - made once per distinct label '''
+        text = u'%s' % label
+        if text not in self.paths:
+            path = TextPath((0, 0), text, prop=self.stamp.get_fontproperties())
+            if len(path.vertices):
+                extents = path.get_extents().extents
+            else:
+                extents = (np.inf, np.inf, -np.inf, -np.inf)   # nothing to draw
+            self.paths[text] = (path, extents)
+        return self.paths[text]
+
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+
+        # every label position on screen in a single transform
+        xy = self.text_transform.transform(np.column_stack((self.x, self.y)))
+        show = np.isfinite(xy).all(axis=1)
+        # leave out a label being animated on its own
+        if self.single_index is not None and self.single_text.get_animated():
+            show[self.single_index] = False
+        index = np.flatnonzero(show)
+        glyphs = [self.label_path(self.labels[i]) for i in index]
+
+        # only the labels reaching onto the canvas
+        scale = renderer.points_to_pixels(1.)
+        extents = scale*np.array([e for path, e in glyphs], dtype=float).reshape(-1, 4)
+        width, height = renderer.get_canvas_width_height()
+        xy = xy[index]
+        seen = np.flatnonzero((xy[:, 0]+extents[:, 2] >= 0) & (xy[:, 0]+extents[:, 0] <= width) &
+                              (xy[:, 1]+extents[:, 3] >= 0) & (xy[:, 1]+extents[:, 1] <= height))
+        if seen.size:
+            # all of them in one go, each glyph path placed at its label's offset
+            gc = renderer.new_gc()
+            gc.set_alpha(self.get_alpha())
+            color = colorConverter.to_rgba(self.stamp.get_color(), self.get_alpha())
+            renderer.draw_path_collection(
+                gc, Affine2D().scale(scale), [glyphs[k][0] for k in seen], [],
+                xy[seen], IdentityTransform(), [color], [], [0], [(None, None)],
+                [True], [None], 'screen')
+            gc.restore()
+        self.stale = False
@@ -0,0 +1,60 @@
+import numpy as np
+
+from decimation import minmax_decimate
+
+class MinMaxPyramid:
+    ''' Min/max summaries of a (possibly memory mapped, very long) array y at
+        several resolutions, so that any slice of it can be drawn at screen
+        resolution by reading only a few thousand values
+
+        Level 0 holds the min and max of every block of 'base' samples, and each
+        level above combines 'factor' blocks of the level below. Building it
+        reads y once, a chunk at a time '''
+
+    base = 64           # samples per block in the finest level
+    factor = 4          # blocks of one level per block of the next
+    chunk = 2**22       # samples of y read at a time while building
+
+    def __init__(self, y):
+        self.y = y
+        N = y.size
+        blocks = -(-N//self.base)
+        mins = np.empty(blocks)
+        maxs = np.empty(blocks)
+
+        # finest level, straight from y - one chunk (a whole number of blocks) at a time
+        for start in range(0, N, self.chunk):
+            chunk = np.asarray(y[start:start+self.chunk], dtype=float)
+            starts = np.arange(0, chunk.size, self.base)
+            first = start//self.base
+            mins[first:first+starts.size] = np.fmin.reduceat(chunk, starts)
+            maxs[first:first+starts.size] = np.fmax.reduceat(chunk, starts)
+        self.levels = [(self.base, mins, maxs)]   # (samples per block, mins, maxs)
+
+        # coarser levels from the level below
+        while mins.size > 1:
+            starts = np.arange(0, mins.size, self.factor)
+            mins = np.fmin.reduceat(mins, starts)
+            maxs = np.fmax.reduceat(maxs, starts)
+            self.levels.append((self.levels[-1][0]*self.factor, mins, maxs))
+
+    def view(self, i0, i1, columns):
+        ''' (index, value) pairs to draw samples i0 to i1 across 'columns' pixels.
+            Indexes are positions in y, and may be fractional (block centres).
+
+            Uses the coarsest level with at least one block per pixel column -
+            a min and max per block - or, if the range is too short for any
+            level, the samples themselves thinned to the min and max per column '''
+        n = i1-i0
+        for size, mins, maxs in reversed(self.levels):
+            if n//size >= columns:
+                b0, b1 = i0//size, -(-i1//size)
+                centres = (np.arange(b0, b1)+0.5)*size
+                index = np.repeat(np.clip(centres, i0, i1-1), 2)
+                values = np.column_stack((mins[b0:b1], maxs[b0:b1])).ravel()
+                return index, values
+
+        index = np.arange(i0, i1)
+        values = np.asarray(self.y[i0:i1], dtype=float)
+        keep = minmax_decimate(index, values, i0, i1, columns)
+        return index[keep], values[keep]
@@ -0,0 +1,121 @@
+import numpy as np
+
+from zoom_plot import ZoomPlot
+from decimation import minmax_decimate, lttb
+from function_adapter import adapt_function
+from errors import NotAFunction
+
+class MultiZoomPlot(ZoomPlot):
+    ''' Like ZoomPlot, but for many functions on one axis - eg. comparing a set
+        of candidate models - sampled on one shared set of x values, with all
+        their lines redrawn together once per zoom
+
+        functions is a function or a list of them. Each gives a line, or, if it
+        returns a 2-D array for an array of x values (a row per curve - eg. all
+        the models evaluated at once with numpy broadcasting), a line per row.
+        Those are called once per zoom for all their curves; other functions are
+        adapted to work on arrays (see FunctionAdapter) '''
+
+    def __init__(self, functions, axis=None, x_min=0, x_max=1, Npoints=100,
+                 decimation=None, interactive=False):
+
+        self.setup_view(axis)   # axis, figure and canvas
+        self.functions = self.sanitise_functions_input(functions)
+        self.vector_functions = self.adapt_functions(self.functions)
+        self.f = self.evaluate          # every function at once, a row each
+        self.vector_f = self.f
+        # uniform sampling only, evaluated straight away without a cache
+        self.setup_sampling(Npoints, decimation=decimation)
+
+        # x values and a row of y values per curve to (initially) plot
+        self.x, self.y = self.sample(x_min, x_max)
+        self.axis.set_xlim(x_min, x_max)
+        self.lines = []
+        self.make_lines()
+        self.set_samples(self.x, self.y)
+        if decimation is not None:
+            # the number of pixels changes with the window size
+            self.cid_resize = self.canvas.mpl_connect('resize_event', self.on_resize)
+        # zooming / panning with the mouse and keyboard
+        self.setup_interaction(interactive)
+
+    def sanitise_functions_input(self, functions):
+        ''' functions needs to be a function or a non-empty list of them '''
+        if callable(functions):
+            functions = [functions]
+        if not isinstance(functions, (list, tuple)) or len(functions) == 0:
+            raise NotAFunction, "MultiZoomPlot(functions) - functions needs to be a function or a list of functions"
+        for f in functions:
+            if not callable(f):
+                raise NotAFunction, "MultiZoomPlot(functions) - functions needs to be a function or a list of functions"
+        return list(functions)
+
+    def adapt_functions(self, functions):
+        ''' functions made to work on arrays of x values - those returning a row
+            per curve as they are, the rest adapted (see FunctionAdapter) '''
+        return [f if self.stacked(f) else adapt_function(self.sanitise_function_input(f))
+                for f in functions]
+
+    def stacked(self, f):
+        ''' whether f returns a 2-D array (a row per curve) for an array of x values '''
+        x = np.linspace(0.5, 1.5, 3)
+        try:
+            y = np.asarray(f(x), dtype=float)
+        except Exception:
+            return False
+        return y.ndim == 2 and y.shape[1] == x.size
+
+    def evaluate(self, x):
+        ''' every curve at x - a row of y values per curve '''
+        rows = [np.asarray(f(x), dtype=float).reshape(-1, x.size) for f in self.vector_functions]
+        return np.vstack(rows)
+
+    def make_lines(self):
+        ''' a line per curve (replacing any old ones) '''
+        for line in self.lines:
+            line.remove()
+        self.lines = [self.axis.plot([], [])[0] for row in self.y]
+        self.line = self.lines[0]
+
+    def update_line(self):
+        ''' sets the data of every line to its samples - with decimation, to the
+            samples that make a visible difference at the current x limits and
+            axis width (picked for each curve) '''
+        columns = max(1, int(self.axis.bbox.width))
+        x_min, x_max = self.axis.get_xlim()
+        for line, y in zip(self.lines, self.y):
+            if self.decimation is None:
+                line.set_data(self.x, y)
+                continue
+            if self.decimation == 'minmax':
+                keep = minmax_decimate(self.x, y, x_min, x_max, columns)
+            else:
+                keep = lttb(self.x, y, columns)
+            line.set_data(self.x[keep], y[keep])
+
+    def plot(self, color=None, linewidth=1):
+        ''' plot the functions being studied (all in color, if it's given) '''
+        for line in self.lines:
+            if color is not None:
+                line.set_color(color)
+            line.set_linewidth(linewidth)
+        self.redraw()
+
+    def set_functions(self, functions, draw=True):
+        ''' change the functions being studied '''
+        self.functions = self.sanitise_functions_input(functions)
+        self.vector_functions = self.adapt_functions(self.functions)
+        if self.stats is not None:
+            self.vector_f = self.stats.timed('f', self.evaluate)
+        else:
+            self.vector_f = self.evaluate
+        x_min, x_max = self.axis.get_xlim()
+        self.x, self.y = self.sample(x_min, x_max)
+        self.make_lines()
+        self.set_samples(self.x, self.y)
+        if draw:
+            self.redraw()
+
+    def set_function(self, f, draw=True):
+        ''' change to studying the single function f '''
+        self.set_functions([f], draw=draw)
@@ -0,0 +1,64 @@
+''' Finding the zeros of a function many at a time - every step works on arrays
+    of brackets, so f is called once per step however many roots are wanted '''
+
+import numpy as np
+
+def find_brackets(x, y):
+    ''' indices i where y changes sign (or is 0) between x[i] and x[i+1] '''
+    y0, y1 = y[:-1], y[1:]
+    return np.flatnonzero((np.sign(y0)*np.sign(y1) <= 0) & np.isfinite(y0) & np.isfinite(y1))
+
+def refine_roots(f, a, b, fa, fb, xtol=1e-12, max_iterations=100):
+    ''' roots of f inside the brackets [a, b] (f(a), f(b) of opposite signs),
+        found with the Illinois variant of false position - a bracketing method
+        converging much faster than bisection. All brackets are refined together
+        with one call of f on an array per iteration '''
+    a, b = np.array(a, dtype=float), np.array(b, dtype=float)
+    fa, fb = np.array(fa, dtype=float), np.array(fb, dtype=float)
+    side = np.zeros(a.size, dtype=int)  # which end was kept last time (-1 a, +1 b)
+    active = np.flatnonzero((fa != 0) & (fb != 0))
+    for iteration in range(max_iterations):
+        if active.size == 0:
+            break
+        A, B, FA, FB = a[active], b[active], fa[active], fb[active]
+        c = (A*FB - B*FA)/(FB - FA)
+        fc = np.asarray(f(c), dtype=float)*np.ones(c.size)
+
+        # root between a and c - c replaces b, and if b was kept last time too
+        # halve f(a) so the next estimate moves off the stuck end (Illinois)
+        left = np.sign(fc) == np.sign(FB)
+        right = ~left
+        b[active[left]], fb[active[left]] = c[left], fc[left]
+        halve = left & (side[active] == -1)
+        fa[active[halve]] *= 0.5
+        a[active[right]], fa[active[right]] = c[right], fc[right]
+        halve = right & (side[active] == +1)
+        fb[active[halve]] *= 0.5
+        side[active] = np.where(left, -1, +1)
+
+        done = (fc == 0) | (np.abs(b[active]-a[active]) <= xtol*(1+np.abs(c)))
+        done |= np.abs(c - np.where(left, B, A)) <= xtol*(1+np.abs(c))
+        a[active[fc == 0]] = b[active[fc == 0]] = c[fc == 0]
+        active = active[~done]
+
+    # end with f exactly 0 if there is one, else the more recent estimate
+    return np.where(fa == 0, a, np.where(fb == 0, b, np.where(side == -1, b, a)))
+
+def nearest_roots(f, x0, x, y, xtol=1e-12):
+    ''' for each value of x0, the root of f closest to it - using the samples
+        y = f(x) to bracket the roots (nan if there aren't any). Only the
+        brackets nearest some x0 are refined, in a single batch '''
+    x0 = np.atleast_1d(np.asarray(x0, dtype=float))
+    brackets = find_brackets(x, y)
+    if brackets.size == 0:
+        return np.nan*x0
+
+    # bracket closest to each x0 - by distance to the nearer end of the bracket
+    lo, hi = x[brackets], x[brackets+1]
+    distance = np.fmax(np.fmax(lo - x0[:, np.newaxis], x0[:, np.newaxis] - hi), 0)
+    nearest = distance.argmin(axis=1)
+
+    wanted, which = np.unique(nearest, return_inverse=True)
+    i = brackets[wanted]
+    roots = refine_roots(f, x[i], x[i+1], y[i], y[i+1], xtol)
+    return roots[which]
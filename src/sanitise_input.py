@@ -1,30 +1,26 @@
 from errors import NotAFunction, NotAnAxis, NotALine, \
-DimensionMismatch, BadLabelInput
+DimensionMismatch, BadLabelInput, BadSamplingInput, BadDecimationInput, BadEvaluationInput, \
+BadRateInput
+from function_adapter import adapt_function
 
-import matplotlib.pyplot as plt
+# the types are checked against the modules defining them - pyplot (which
+# picks a GUI backend) is only imported if a figure has to be made
 from matplotlib.axes import Axes
-from matplotlib.pyplot import figure
+from matplotlib.lines import Line2D
 
 class SanitiseInput:
     ''' Class with methods to sanitise expected inputs - making sure that they are
         lines, axis, functions, numpy objects etc... when expected '''
     
     def sanitise_function_input(self, f):
-        ''' Make sure f is a function / is callable '''
+        ''' Make sure f is a function / is callable, and works on numbers '''
         if not callable(f):
             raise NotAFunction, "f needs to be a callable function eg. f(x)"
         else:
-            # f is callable, but it may take other input like strings / classes
-            # make sure it works with single number input calls
-            try:
-                f(0.0)
-            # if this doesn't work then it's either a) Infinite at x=0, which is OK
-            # as we're just testing to see if it takes in numbers
-            except ZeroDivisionError:
-                pass
-            except:
-                raise NotAFunction, "f needs to operate on numbers eg. f(4)"
-            
+            # f is callable, but it may take other input like strings / classes -
+            # adapting it checks it works with numbers (and remembers how, see
+            # FunctionAdapter)
+            adapt_function(f)
             return f
             
     def sanitise_axis_input(self, axis):
@@ -32,6 +28,7 @@ class SanitiseInput:
         if isinstance(axis, Axes):
             return axis
         elif axis == None:
+            from matplotlib.pyplot import figure
             fig = figure()
             return fig.add_subplot(111)
         else:
@@ -41,7 +38,7 @@ class SanitiseInput:
         ''' Make sure the given input to the class is appropriate
             line needs to be of type Line2D '''
         # Make sure line given is of type line
-        if not isinstance(line, plt.Line2D):
+        if not isinstance(line, Line2D):
             raise NotALine, "ClickPlot(line) - line needs to be object of class Line2D - eg. line = matplotlib.pyplot.plot(x,y)"
         else:
             return line
@@ -73,4 +70,54 @@ class SanitiseInput:
                 return [label]
         else:
             raise BadLabelInput, "ClickPlot(line, label) - label must be either a list, float, str or int"
-    
\ No newline at end of file
+    
+    def sanitise_label_mode_input(self, label_mode):
+        ''' label_mode is how the labels are drawn, either
+                'text' - a matplotlib Text for every label
+                'batch' - a single LabelCollection artist for all labels
+                'virtual' - a VirtualLabels artist drawing only the labels in view '''
+        if label_mode not in ('text', 'batch', 'virtual'):
+            raise BadLabelInput, "ClickPlot(line, label_mode) - label_mode must be 'text', 'batch' or 'virtual'"
+        return label_mode
+    
+    def sanitise_max_labels_input(self, max_labels):
+        ''' max_labels (the most labels drawn at once in 'virtual' label_mode)
+            needs to be a positive integer '''
+        if not isinstance(max_labels, (int, long)) or isinstance(max_labels, bool) or max_labels < 1:
+            raise BadLabelInput, "ClickPlot(line, max_labels) - max_labels must be a positive integer"
+        return max_labels
+    
+    def sanitise_sampling_input(self, sampling):
+        ''' sampling is how x values are picked when plotting a function, either
+                'uniform' - evenly spaced
+                'adaptive' - closer together where the curve bends '''
+        if sampling not in ('uniform', 'adaptive'):
+            raise BadSamplingInput, "ZoomPlot(f, sampling) - sampling must be 'uniform' or 'adaptive'"
+        return sampling
+    
+    def sanitise_evaluation_input(self, evaluation):
+        ''' evaluation is where a function is evaluated when plotting it, either
+                'direct' - straight away
+                'thread' / 'process' - in the background by a pool of workers '''
+        if evaluation not in ('direct', 'thread', 'process'):
+            raise BadEvaluationInput, "ZoomPlot(f, evaluation) - evaluation must be 'direct', 'thread' or 'process'"
+        return evaluation
+    
+    def sanitise_decimation_input(self, decimation):
+        ''' decimation is how samples are thinned out before drawing, either
+                None - they aren't
+                'minmax' - lowest and highest sample in each pixel column
+                'lttb' - largest triangle three buckets (per pixel column), plus
+                         each column's lowest and highest sample '''
+        if decimation not in (None, 'minmax', 'lttb'):
+            raise BadDecimationInput, "ZoomPlot(f, decimation) - decimation must be None, 'minmax' or 'lttb'"
+        return decimation
+    
+    def sanitise_rate_input(self, rate):
+        ''' rate is how often changes are sent to a subscriber while dragging, either
+                'frame' - after every drawn motion
+                'debounce' - once the dragged point is still
+                'release' - when the dragged point is let go '''
+        if rate not in ('frame', 'debounce', 'release'):
+            raise BadRateInput, "DragPlot.subscribe(callback, rate) - rate must be 'frame', 'debounce' or 'release'"
+        return rate
\ No newline at end of file
@@ -0,0 +1,201 @@
+import numpy as np
+
+class GridIndex:
+    ''' A uniform grid over a set of x,y points, used to find the point closest
+        to a click without measuring the distance to every point.
+
+        Distances are measured as hypot(dx/x_scale, dy/y_scale) so the same grid
+        can answer both plain data-space queries (scales of 1) and the axis
+        normalised queries of ClickPlot.get_closest_point_axis (scales equal to
+        the axis ranges).
+
+        Single points can be moved with update() without rebuilding - moved
+        points are taken out of the grid and checked separately, and the grid
+        is only rebuilt once too many of them have piled up '''
+
+    points_per_cell = 4     # average number of points to aim for in each cell
+    max_moved = 64          # number of moved points to allow before rebuilding
+
+    def __init__(self, x, y):
+        self.build(x, y)
+
+    def build(self, x, y):
+        ''' (re)builds the grid from the x,y data '''
+        self.x = np.array(x, dtype=float)
+        self.y = np.array(y, dtype=float)
+        N = self.x.size
+
+        # points which can't be placed in the grid (nan / inf) are never returned
+        finite = np.isfinite(self.x) & np.isfinite(self.y)
+
+        # grid dimensions - roughly square, with a few points per cell
+        self.nx = self.ny = max(1, int(np.ceil(np.sqrt(N/float(self.points_per_cell)))))
+        if finite.any():
+            self.x_min, x_max = self.x[finite].min(), self.x[finite].max()
+            self.y_min, y_max = self.y[finite].min(), self.y[finite].max()
+        else:
+            self.x_min, x_max, self.y_min, y_max = 0., 1., 0., 1.
+        self.dx = (x_max-self.x_min)/self.nx or 1.
+        self.dy = (y_max-self.y_min)/self.ny or 1.
+
+        # sort the point indices by cell, then each cell is a slice of self.order
+        # non-finite points go into an extra cell past the end which is never searched
+        N_cells = self.nx*self.ny
+        cell = np.full(N, N_cells, dtype=int)
+        ix, iy = self.cell_of(self.x[finite], self.y[finite])
+        cell[finite] = ix*self.ny + iy
+        self.order = np.argsort(cell, kind='mergesort')
+        self.starts = np.searchsorted(cell[self.order], np.arange(N_cells+1))
+
+        # points moved since the grid was built
+        self.moved = np.zeros(N, dtype=bool)
+        self.moved_indices = []
+
+    def cell_of(self, x, y):
+        ''' grid cell (ix, iy) containing x, y - clipped to the edge of the grid '''
+        ix = np.clip(np.floor((x-self.x_min)/self.dx), 0, self.nx-1).astype(int)
+        iy = np.clip(np.floor((y-self.y_min)/self.dy), 0, self.ny-1).astype(int)
+        return ix, iy
+
+    def update(self, i, x, y):
+        ''' moves the i'th point to x, y '''
+        self.x[i] = x
+        self.y[i] = y
+        if not self.moved[i]:
+            self.moved[i] = True
+            self.moved_indices.append(i)
+        # too many points being checked outside the grid - start again
+        if len(self.moved_indices) > self.max_moved:
+            self.build(self.x, self.y)
+
+    def ring(self, ix, iy, k):
+        ''' point indices in cells exactly k cells away from cell (ix, iy) '''
+        i = np.arange(max(ix-k, 0), min(ix+k, self.nx-1)+1)
+        j = np.arange(max(iy-k, 0), min(iy+k, self.ny-1)+1)
+        if k == 0:
+            cells = np.array([ix*self.ny + iy])
+        else:
+            # top and bottom rows of the ring, then left and right columns
+            rows = [r for r in (ix-k, ix+k) if 0 <= r < self.nx]
+            cols = [c for c in (iy-k, iy+k) if 0 <= c < self.ny]
+            inner = i[(i > ix-k) & (i < ix+k)]
+            cells = [r*self.ny + j for r in rows] + [inner*self.ny + c for c in cols]
+            if not cells:
+                return np.array([], dtype=int)
+            cells = np.concatenate(cells)
+
+        # gather the slices of self.order belonging to each cell
+        starts = self.starts[cells]
+        counts = self.starts[cells+1] - starts
+        total = counts.sum()
+        if total == 0:
+            return np.array([], dtype=int)
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        return self.order[offsets + np.arange(total)]
+
+    def closest(self, x, y, x_scale=1., y_scale=1.):
+        ''' returns (index, distance) of the point closest to x, y with distances
+            measured as hypot(dx/x_scale, dy/y_scale) '''
+        x_scale, y_scale = abs(float(x_scale)), abs(float(y_scale))
+        best_index, best_distance = None, np.inf
+
+        # moved points are no longer where the grid thinks they are - check them directly
+        if self.moved_indices:
+            moved = np.array(self.moved_indices)
+            distance = np.hypot((x-self.x[moved])/x_scale, (y-self.y[moved])/y_scale)
+            if distance.size and not np.isnan(distance).all():
+                k = np.nanargmin(distance)
+                best_index, best_distance = moved[k], distance[k]
+
+        # search outwards one ring of cells at a time
+        ix, iy = self.cell_of(x, y)
+        ix, iy = int(ix), int(iy)
+        for k in range(max(self.nx, self.ny)):
+            candidates = self.ring(ix, iy, k)
+            candidates = candidates[~self.moved[candidates]]
+            if candidates.size:
+                distance = np.hypot((x-self.x[candidates])/x_scale,
+                                    (y-self.y[candidates])/y_scale)
+                j = distance.argmin()
+                if distance[j] < best_distance:
+                    best_index, best_distance = candidates[j], distance[j]
+
+            # any point beyond this ring is at least as far as the edge of the
+            # block of cells searched so far (unless that edge is the grid edge)
+            edge = np.inf
+            if ix-k > 0:
+                edge = min(edge, (x - (self.x_min + (ix-k)*self.dx))/x_scale)
+            if ix+k < self.nx-1:
+                edge = min(edge, (self.x_min + (ix+k+1)*self.dx - x)/x_scale)
+            if iy-k > 0:
+                edge = min(edge, (y - (self.y_min + (iy-k)*self.dy))/y_scale)
+            if iy+k < self.ny-1:
+                edge = min(edge, (self.y_min + (iy+k+1)*self.dy - y)/y_scale)
+            if best_distance <= edge:
+                break
+
+        return best_index, best_distance
+
+class SegmentIndex:
+    ''' Bounding boxes of blocks of consecutive segments of a line through the
+        points x,y, used to find the point on the line closest to a point
+        without measuring the distance to every segment.
+
+        Distances are measured as hypot(dx/x_scale, dy/y_scale), like GridIndex.
+        Blocks are looked at closest bounding box first, and the search stops
+        once the next bounding box is further away than the closest point found '''
+
+    block = 64      # segments per block
+
+    def __init__(self, x, y):
+        self.x = np.array(x, dtype=float)
+        self.y = np.array(y, dtype=float)
+        N = max(self.x.size-1, 0)     # number of segments
+        self.N = N
+
+        # bounding box of each segment, then of each block of segments
+        starts = np.arange(0, N, self.block)
+        x0, x1, y0, y1 = self.x[:-1], self.x[1:], self.y[:-1], self.y[1:]
+        if N:
+            self.x_min = np.fmin.reduceat(np.fmin(x0, x1), starts)
+            self.x_max = np.fmax.reduceat(np.fmax(x0, x1), starts)
+            self.y_min = np.fmin.reduceat(np.fmin(y0, y1), starts)
+            self.y_max = np.fmax.reduceat(np.fmax(y0, y1), starts)
+        else:
+            self.x_min = self.x_max = self.y_min = self.y_max = np.array([])
+
+    def closest(self, x, y, x_scale=1., y_scale=1.):
+        ''' returns (x, y, distance) of the point on the line closest to x, y,
+            with distances measured as hypot(dx/x_scale, dy/y_scale) '''
+        x_scale, y_scale = abs(float(x_scale)), abs(float(y_scale))
+        if self.N == 0:
+            if self.x.size:
+                return self.x[0], self.y[0], np.hypot((x-self.x[0])/x_scale, (y-self.y[0])/y_scale)
+            return None, None, np.inf
+
+        # shortest possible distance to each block - 0 if x,y is inside its box
+        dx = np.fmax(np.fmax(self.x_min-x, x-self.x_max), 0)/x_scale
+        dy = np.fmax(np.fmax(self.y_min-y, y-self.y_max), 0)/y_scale
+        bound = np.hypot(dx, dy)
+        bound[np.isnan(bound)] = np.inf
+
+        best = (None, None, np.inf)
+        for b in np.argsort(bound):
+            if bound[b] >= best[2]:
+                break
+            # project x,y onto each segment of the block (in scaled coordinates)
+            s = slice(b*self.block, min((b+1)*self.block, self.N)+1)
+            X, Y = self.x[s]/x_scale, self.y[s]/y_scale
+            px, py = x/x_scale, y/y_scale
+            dX, dY = np.diff(X), np.diff(Y)
+            length2 = dX*dX + dY*dY
+            t = ((px-X[:-1])*dX + (py-Y[:-1])*dY)/np.where(length2 > 0, length2, 1)
+            t = np.clip(t, 0, 1)
+            qx, qy = X[:-1]+t*dX, Y[:-1]+t*dY
+            distance = np.hypot(px-qx, py-qy)
+            if np.isnan(distance).all():
+                continue
+            k = np.nanargmin(distance)
+            if distance[k] < best[2]:
+                best = (qx[k]*x_scale, qy[k]*y_scale, distance[k])
+        return best
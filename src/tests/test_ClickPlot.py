@@ -102,4 +102,120 @@ def test_closest_point_axis():
     
     index, dist = plot.get_closest_point_axis(click_x, click_y)
     assert index == 1   
-    
\ No newline at end of file
+    
+def test_spatial_index_closest_point():
+    ''' ClickPlot(line, spatial_index=True) should find the same closest points as a brute force search '''
+    np.random.seed(0)
+    xs = np.random.rand(2000)*1000
+    ys = np.random.rand(2000)
+    line, = plt.plot(xs, ys)
+    plot = ClickPlot(line)
+    grid_plot = ClickPlot(line, spatial_index=True)
+    
+    for click_x, click_y in np.random.rand(50,2)*[1200, 1.2] - [100, 0.1]:
+        assert_equal(grid_plot.get_closest_point(click_x, click_y), plot.get_closest_point(click_x, click_y))
+        assert_equal(grid_plot.get_closest_point_axis(click_x, click_y), plot.get_closest_point_axis(click_x, click_y))
+
+def test_spatial_index_moved_point():
+    ''' ClickPlot.set_point(i, x, y) should be seen by the spatial index without replacing the data '''
+    xs = np.arange(100.)
+    ys = np.zeros(100)
+    line, = plt.plot(xs, ys)
+    plot = ClickPlot(line, spatial_index=True)
+    
+    grid = plot.get_grid()
+    plot.set_point(3, 50.2, 5)
+    assert plot.grid is grid
+    assert_equal(plot.get_closest_point(50.2, 4), (3, 50.2, 5))
+    
+    # replacing the data rebuilds the grid
+    plot.set_xdata(np.arange(100.))
+    plot.set_ydata(np.ones(100))
+    assert plot.grid is None
+    assert_equal(plot.get_closest_point(3.1, 1), (3, 3, 1))
+
+@with_setup(setup_variables)
+def test_batch_labels():
+    ''' ClickPlot(line, label=Z, label_mode='batch') should hold all labels in one artist that follows the data '''
+    plot = ClickPlot(line, label=label['good'], label_mode='batch')
+    plot.set_xdata(np.array([1., 2., 3.]))
+    plot.set_point(1, 7, 8)
+    assert_equal(list(plot.text.x), [1, 7, 3])
+    assert_equal(list(plot.text.y), [1, 8, 3])
+    assert_equal(plot.label_artist(1).get_position(), (7, 8))
+    plot.canvas.draw()
+
+def test_batch_labels_drawn_together():
+    ''' a LabelCollection should draw all its labels on the canvas with one path collection, a glyph path per distinct label '''
+    from matplotlib.backends.backend_agg import RendererAgg
+    ax = plt.figure().add_subplot(111)
+    x = np.arange(1000.)
+    many, = ax.plot(x, np.zeros(1000), 'o')
+    plot = ClickPlot(many, label=['p%d' % (i % 10) for i in range(1000)], label_mode='batch')
+    ax.set_xlim(-0.5, 99.5)
+    
+    calls = []
+    draw_path_collection = RendererAgg.draw_path_collection
+    def record(renderer, gc, master_transform, paths, *args):
+        calls.append(len(paths))
+        return draw_path_collection(renderer, gc, master_transform, paths, *args)
+    RendererAgg.draw_path_collection = record
+    try:
+        plot.canvas.draw()
+    finally:
+        RendererAgg.draw_path_collection = draw_path_collection
+    # the labels of points well off the canvas are left out
+    assert_equal(len(calls), 1)
+    assert 100 <= calls[0] < 150
+    assert_equal(len(plot.text.paths), 10)
+
+@with_setup(setup_variables)
+def test_bad_label_mode():
+    ''' ClickPlot(line, label_mode=Z) should fail if Z is not a known label mode '''
+    assert_raises(BadLabelInput, ClickPlot, line, label=label['good'], label_mode='fancy')
+
+def test_virtual_labels():
+    ''' ClickPlot(line, label=Z, label_mode='virtual') should only make and draw Texts for labels in view, up to max_labels '''
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    x = np.arange(10000.)
+    many, = ax.plot(x, np.zeros(10000), 'o')
+    plot = ClickPlot(many, label=[str(i) for i in range(10000)], label_mode='virtual',
+                     label_size=10, max_labels=50)
+    assert_equal(plot.label_artists(), [plot.text])
+    assert_equal(plot.text.pool, [])
+    
+    # labels for the points in view, no closer than a label height
+    ax.set_xlim(99.5, 109.5)
+    fig.canvas.draw()
+    assert_equal(list(plot.text.shown), range(100, 110))
+    assert_equal(len(plot.text.pool), 10)
+    
+    # zoomed out, most points would overlap - the pool is reused and capped
+    ax.set_xlim(-1, 10000)
+    fig.canvas.draw()
+    assert 0 < len(plot.text.shown) <= 50
+    assert_equal(len(plot.text.pool), len(plot.text.shown))
+    
+    # labels follow the data
+    ax.set_xlim(-0.5, 3.5)
+    plot.set_point(2, 2, 0.01)
+    plot.set_ydata(np.full(10000, 0.02))
+    fig.canvas.draw()
+    assert_equal(list(plot.text.shown), [0, 1, 2, 3])
+    assert_equal(plot.text.pool[2].get_position(), (2, 0.02))
+    assert_equal(plot.label_artist(2).get_text(), '2')
+    
+    assert_raises(BadLabelInput, ClickPlot, many, label_mode='virtual', max_labels=0)
+
+def test_lazy_import():
+    ''' importing interactive_plot should import neither the class modules nor pyplot until a class is used '''
+    import os, sys, subprocess
+    script = '\n'.join(['import sys',
+                        'import interactive_plot',
+                        'print "click_plot" in sys.modules, "matplotlib.pyplot" in sys.modules',
+                        'interactive_plot.DragRoot',
+                        'print "drag_root" in sys.modules, "matplotlib.pyplot" in sys.modules'])
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+    output = subprocess.check_output([sys.executable, '-c', script], cwd=src)
+    assert_equal(output.split(), ['False', 'False', 'True', 'False'])
@@ -1,6 +1,8 @@
 ''' Test functionality of DragPlot Class '''
 
-from interactive_plot import DragPlot
+from interactive_plot import DragPlot, DragRoot, EventRecorder, EventReplayer
+from change_log import ChangeLog
+from drag_dispatcher import DragDispatcher
 from errors import *
 
 from nose.tools import assert_equal, assert_not_equal, assert_almost_equal, assert_raises, raises
@@ -8,6 +10,410 @@ from nose import with_setup
 
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.backend_bases import MouseEvent
 
 line = None
-label = {}
\ No newline at end of file
+label = {}
+def setup_variables():
+    ''' set up function to create a line '''
+    global line
+    xs = np.array([0., 1., 2., 3.])
+    ys = np.array([0., 1., 0., 1.])
+    fig = plt.figure()
+    line, = fig.add_subplot(111).plot(xs, ys, 'o-')
+    
+    global label
+    label['good'] = ['a', 'b', 'c', 'd']
+
+def mouse_event(plot, name, x, y):
+    ''' sends a mouse event at data coordinates x,y to the canvas of plot '''
+    px, py = plot.axis.transData.transform((x, y))
+    plot.canvas.callbacks.process(name, MouseEvent(name, plot.canvas, px, py, button=1))
+
+@with_setup(setup_variables)
+def test_move_point():
+    ''' DragPlot.move_point(x, y) should only change the selected point, and the drag line should cover its neighbours '''
+    drag = DragPlot(line, label=label['good'])
+    drag.index = 2
+    drag.move_point(5, 6)
+    assert_equal(list(drag.get_xdata()), [0, 1, 5, 3])
+    assert_equal(list(drag.get_ydata()), [0, 1, 6, 1])
+    assert_equal(drag.text[2].get_position(), (5, 6))
+    assert_equal(list(drag.drag_line.get_xdata()), [1, 5, 3])
+    assert_equal(drag.drag_line.get_markevery(), [1])
+    assert_equal((drag.selected_point.get_xdata(), drag.selected_point.get_ydata()), (5, 6))
+
+@with_setup(setup_variables)
+def test_motion_coalescing():
+    ''' DragPlot(line, max_fps=Z) should drop motions arriving faster than Z per second, but still apply the last one on release '''
+    drag = DragPlot(line, max_fps=1e-3)
+    drag.canvas.draw()
+    
+    mouse_event(drag, 'button_press_event', 1, 1)
+    for y in [0.9, 0.8, 0.7, 0.6]:
+        mouse_event(drag, 'motion_notify_event', 1, y)
+    assert_equal(drag.motion_stats, {'received': 4, 'drawn': 1, 'dropped': 2})
+    
+    mouse_event(drag, 'button_release_event', 1, 0.6)
+    assert_almost_equal(drag.get_ydata()[1], 0.6)
+    assert drag.dispatcher.lock is None
+    
+    # max_fps can still be given by position
+    assert_equal(DragPlot(line, None, 0.1, False, 'text', 30).max_fps, 30)
+
+@with_setup(setup_variables)
+def test_cached_background():
+    ''' consecutive drags should reuse the axis background until the axis changes '''
+    drag = DragPlot(line, label=label['good'])
+    drag.canvas.draw()
+    draws = []
+    drag.canvas.draw = lambda: (draws.append(1), type(drag.canvas).draw(drag.canvas))
+    
+    for x, y in [(1, 1), (2, 0)]:
+        mouse_event(drag, 'button_press_event', x, y)
+        mouse_event(drag, 'motion_notify_event', x, 0.5)
+        mouse_event(drag, 'button_release_event', x, 0.5)
+    assert_equal(len(draws), 1)
+    
+    # new limits - background has to be redrawn
+    drag.axis.set_xlim(-1, 4)
+    mouse_event(drag, 'button_press_event', 1, 0.5)
+    mouse_event(drag, 'button_release_event', 1, 0.5)
+    assert_equal(len(draws), 2)
+    
+    # something else in the figure has changed - redrawn too
+    mouse_event(drag, 'button_press_event', 1, 0.5)
+    mouse_event(drag, 'button_release_event', 1, 0.5)
+    assert_equal(len(draws), 2)
+    drag.axis.set_title('changed')
+    mouse_event(drag, 'button_press_event', 1, 0.5)
+    mouse_event(drag, 'button_release_event', 1, 0.5)
+    assert_equal(len(draws), 3)
+
+@with_setup(setup_variables)
+def test_cached_background_ticks():
+    ''' turning the grid on / off or changing the ticks should redraw the cached background '''
+    drag = DragPlot(line, label=label['good'])
+    drag.canvas.draw()
+    draws = []
+    drag.canvas.draw = lambda: (draws.append(1), type(drag.canvas).draw(drag.canvas))
+    
+    def press():
+        mouse_event(drag, 'button_press_event', 1, 1)
+        mouse_event(drag, 'button_release_event', 1, 1)
+    press()
+    press()
+    assert_equal(len(draws), 1)
+    for change in [lambda: drag.axis.grid(True), lambda: drag.axis.grid(False),
+                   lambda: drag.axis.tick_params(labelsize=30),
+                   lambda: drag.axis.xaxis.set_tick_params(color='red')]:
+        change()
+        before = len(draws)
+        press()
+        press()
+        assert_equal(len(draws), before+1)
+
+def test_dispatcher_picks_closest_line():
+    ''' a press should pick the closest point over every DragPlot in the axis, locking only that canvas '''
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    first, = ax.plot([0., 1., 2.], [0., 0., 0.], 'o')
+    second, = ax.plot([0., 1., 2.], [0.05, 1., 2.], 'o')
+    ax.set_ylim(-1, 3)
+    drag_first, drag_second = DragPlot(first), DragPlot(second)
+    assert drag_first.dispatcher is drag_second.dispatcher
+    fig.canvas.draw()
+    
+    other_line, = plt.figure().add_subplot(111).plot([0., 1.], [0., 1.], 'o')
+    other = DragPlot(other_line)
+    other.canvas.draw()
+    
+    mouse_event(drag_first, 'button_press_event', 0, 0.04)
+    assert drag_second.dispatcher.lock is drag_second
+    assert_equal((drag_first.index, drag_second.index), (None, 0))
+    
+    # a different figure isn't blocked
+    mouse_event(other, 'button_press_event', 1, 1)
+    assert other.dispatcher.lock is other
+    
+    # the lock as it was before each canvas had its own
+    assert drag_second.lock is drag_second
+    assert DragPlot.lock in (drag_second, other)
+    mouse_event(drag_second, 'button_release_event', 0, 0.04)
+    mouse_event(other, 'button_release_event', 1, 1)
+    assert DragPlot.lock is None
+    DragPlot.lock = other
+    assert other.dispatcher.lock is other
+    DragPlot.lock = None
+    assert DragPlot.lock is None and other.dispatcher.lock is None
+
+def test_dispatcher_calls_on_press():
+    ''' the dispatcher should send a press to the on_press of the DragPlot it picks, so subclasses can override it '''
+    presses = []
+    class CountingDragPlot(DragPlot):
+        def on_press(self, event):
+            presses.append(self)
+            DragPlot.on_press(self, event)
+    ax = plt.figure().add_subplot(111)
+    points, = ax.plot([0., 1., 2.], [0., 1., 2.], 'o')
+    drag = CountingDragPlot(points)
+    drag.canvas.draw()
+    mouse_event(drag, 'button_press_event', 1, 1)
+    assert_equal(presses, [drag])
+    assert_equal(drag.index, 1)
+    mouse_event(drag, 'button_release_event', 1, 1)
+    # a press away from every point isn't sent
+    mouse_event(drag, 'button_press_event', 0, 2)
+    assert_equal(presses, [drag])
+
+def test_dispatcher_releases_figure():
+    ''' a figure with DragPlots shouldn't be kept alive by its canvas' DragDispatcher '''
+    import gc, weakref
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure()
+    canvas = FigureCanvasAgg(fig)
+    line, = fig.add_subplot(111).plot([0., 1.], [0., 1.], 'o')
+    drag = DragPlot(line)
+    dispatcher = drag.dispatcher
+    assert_equal(dispatcher.plots, [drag])
+    canvas_ref = weakref.ref(canvas)
+    
+    del fig, canvas, line, drag
+    gc.collect()
+    assert canvas_ref() is None
+    assert_equal(dispatcher.plots, [])
+    assert dispatcher not in DragDispatcher.dispatchers.values()
+
+def test_drag_root_lookup():
+    ''' DragRoot(line, f, lookup=True) should interpolate f while dragging and evaluate it exactly on release '''
+    import math
+    ax = plt.figure().add_subplot(111)
+    points, = ax.plot([1., 2.], [math.sin(1), math.sin(2)], 'o')
+    ax.set_xlim(0, 3)
+    ax.set_ylim(-1, 1)
+    calls = []
+    def f(x):
+        y = math.sin(x)
+        calls.append(x)
+        return y
+    drag = DragRoot(points, f, lookup=True, lookup_points=50)
+    drag.canvas.draw()
+    
+    mouse_event(drag, 'button_press_event', 1, math.sin(1))
+    for x in np.linspace(1, 1.5, 20):
+        mouse_event(drag, 'motion_notify_event', x, 0)
+    # just the table, made from single numbers (after a probe finding f only takes those)
+    assert_equal(len(calls), 1+50)
+    assert abs(drag.get_ydata()[0] - math.sin(1.5)) < 1e-3
+    
+    mouse_event(drag, 'button_release_event', 1.5, 0)
+    assert_equal(len(calls), 1+51)
+    assert_almost_equal(drag.get_ydata()[0], math.sin(drag.get_xdata()[0]))
+
+def test_drag_root_projection():
+    ''' DragRoot(line, f, projection=True) should move a point to the closest point of the curve, not the one below the mouse '''
+    ax = plt.figure().add_subplot(111)
+    steep = lambda x: 100*x
+    points, = ax.plot([0.], [0.], 'o')
+    ax.set_xlim(-1, 1)
+    ax.set_ylim(-1, 1)
+    drag = DragRoot(points, steep, projection=True)
+    drag.canvas.draw()
+    
+    mouse_event(drag, 'button_press_event', 0, 0)
+    mouse_event(drag, 'motion_notify_event', 0.5, 0.5)
+    assert abs(drag.get_xdata()[0] - 0.005) < 1e-3
+    assert abs(drag.get_ydata()[0] - 0.5) < 0.1
+    
+    mouse_event(drag, 'button_release_event', 0.5, 0.5)
+    assert_almost_equal(drag.get_ydata()[0], steep(drag.get_xdata()[0]))
+
+def test_drag_root_snap_to_root():
+    ''' DragRoot(line, f, snap_to_root=True) should move released points, and snap_roots() all points, to the nearest roots of f '''
+    ax = plt.figure().add_subplot(111)
+    points, = ax.plot([0.5, 2.5, 4., 6.], [0., 0., 0., 0.], 'o')
+    ax.set_xlim(0, 10)
+    ax.set_ylim(-1, 1)
+    drag = DragRoot(points, np.sin, snap_to_root=True)
+    drag.canvas.draw()
+    
+    mouse_event(drag, 'button_press_event', 2.5, 0)
+    mouse_event(drag, 'motion_notify_event', 3.5, 0)
+    mouse_event(drag, 'button_release_event', 3.5, 0)
+    assert_almost_equal(drag.get_xdata()[1], np.pi)
+    
+    # indices given as a list
+    drag.snap_roots([0])
+    assert_almost_equal(drag.get_xdata()[0], 0)
+    assert_equal(drag.get_xdata()[2], 4.)
+    
+    drag.snap_roots()
+    for x, root in zip(drag.get_xdata(), [0, np.pi, np.pi, 2*np.pi]):
+        assert_almost_equal(x, root)
+
+@with_setup(setup_variables)
+def test_record_and_replay():
+    ''' a drag recorded with EventRecorder should move the same point to the same place when replayed on a new figure '''
+    recorder = EventRecorder(line.get_figure())
+    drag = DragPlot(line)
+    mouse_event(drag, 'button_press_event', 1, 1)
+    mouse_event(drag, 'motion_notify_event', 1.5, 0.5)
+    mouse_event(drag, 'motion_notify_event', 1.2, 0.8)
+    mouse_event(drag, 'button_release_event', 1.2, 0.8)
+    recorder.stop()
+    assert_equal(len(recorder.events), 4)
+    assert_equal(list(recorder.events['axis']), [0, 0, 0, 0])
+    
+    setup_variables()
+    replayer = EventReplayer(recorder, line.get_figure())
+    replayed = DragPlot(line)
+    assert_equal(replayer.replay(speed=None).size, 4)
+    assert_almost_equal(replayed.get_xdata()[1], 1.2)
+    assert_almost_equal(replayed.get_ydata()[1], 0.8)
+    assert_equal(list(replayed.get_xdata()[[0, 2, 3]]), [0, 2, 3])
+
+@with_setup(setup_variables)
+def test_instrumentation():
+    ''' DragPlot.instrument() should time the mouse handlers and count draws and blits, and call the callbacks '''
+    drag = DragPlot(line)
+    stats = drag.instrument()
+    recorded = []
+    stats.add_callback(lambda name, seconds: recorded.append(name))
+    mouse_event(drag, 'button_press_event', 1, 1)
+    mouse_event(drag, 'motion_notify_event', 1.5, 0.5)
+    mouse_event(drag, 'motion_notify_event', 1.2, 0.8)
+    mouse_event(drag, 'button_release_event', 1.2, 0.8)
+    assert_equal(stats.count('on_press'), 1)
+    assert_equal(stats.count('on_motion'), 2)
+    assert_equal(stats.count('on_release'), 1)
+    assert_equal(stats.count('get_closest_point_axis'), 1)
+    assert_equal(stats.count('draw'), 1)
+    assert_equal(stats.count('blit'), 4)
+    assert_equal(recorded.count('blit'), 4)
+    summary = stats.summary()['on_motion']
+    assert summary['p50'] <= summary['p99'] <= summary['max']
+    # instrumenting again keeps the same stats
+    assert drag.instrument() is stats
+
+@with_setup(setup_variables)
+def test_change_subscriptions():
+    ''' DragPlot.subscribe(callback, rate) should send the changed points as (indices, old, new) batches at the chosen rate '''
+    drag = DragPlot(line)
+    sent = {'frame': [], 'debounce': [], 'release': []}
+    for rate in sent:
+        drag.subscribe(lambda indices, old, new, rate=rate: sent[rate].append((indices, old, new)), rate=rate)
+    mouse_event(drag, 'button_press_event', 1, 1)
+    mouse_event(drag, 'motion_notify_event', 1.5, 0.5)
+    mouse_event(drag, 'motion_notify_event', 1.2, 0.8)
+    assert_equal(len(sent['frame']), 2)
+    assert_equal(len(sent['debounce']), 0)
+    assert_equal(len(sent['release']), 0)
+    mouse_event(drag, 'button_release_event', 1.2, 0.8)
+    assert_equal(len(sent['frame']), 2)
+    
+    # a whole drag is one batch - from where the point started to where it ended
+    for rate in ['debounce', 'release']:
+        assert_equal(len(sent[rate]), 1)
+        indices, old, new = sent[rate][0]
+        assert_equal(list(indices), [1])
+        assert_equal(list(old[0]), [1, 1])
+        assert_almost_equal(new[0, 0], 1.2)
+        assert_almost_equal(new[0, 1], 0.8)
+    
+    # changes made outside a drag are sent straight away
+    y = np.array(drag.get_ydata())
+    y[2] = 5
+    drag.set_ydata(y)
+    indices, old, new = sent['release'][-1]
+    assert_equal(list(indices), [2])
+    assert_equal(list(new[0]), [2, 5])
+
+def test_change_log_merging():
+    ''' ChangeLog should keep one entry per point once merged, and leave out points moved back '''
+    log = ChangeLog()
+    for step in range(200):
+        log.add([step % 3], [[step, 0]], [[step+1, 0]])
+    log.add([0], [[199, 0]], [[0, 0]])
+    assert len(log.batches) <= log.max_batches
+    indices, old, new = log.flush()
+    assert_equal(list(indices), [1, 2])
+    assert_equal(list(old[:, 0]), [1, 2])
+    assert_equal(list(new[:, 0]), [200, 198])
+    assert_equal(log.flush(), None)
+
+@raises(BadRateInput)
+@with_setup(setup_variables)
+def test_bad_subscription_rate():
+    ''' DragPlot.subscribe(callback, rate) should only take known rates '''
+    DragPlot(line).subscribe(lambda indices, old, new: None, rate='often')
+
+@with_setup(setup_variables)
+def test_linked_views():
+    ''' linked DragPlots should share one data buffer, and dragging in one should move the point in all of them by blitting '''
+    fig = line.get_figure()
+    raw = DragPlot(line, label=label['good'])
+    log_axis = fig.add_subplot(212)
+    log_line, = log_axis.plot([0., 0., 0., 0.], [1., 1., 1., 1.], 'o-')
+    log_axis.set_yscale('log')
+    inset, = plt.figure().add_subplot(111).plot([0., 0., 0., 0.], [1., 1., 1., 1.], 'o-')
+    log_view = DragPlot(log_line, label=['a', 'b', 'c', 'd'])
+    inset_view = DragPlot(inset)
+    raw.link(log_view, inset_view)
+    assert log_line.get_xdata() is line.get_xdata()
+    assert inset.get_ydata() is line.get_ydata()
+    
+    stats = raw.instrument()
+    stats.watch_canvas(inset.get_figure().canvas)
+    for canvas in [fig.canvas, inset.get_figure().canvas]:
+        canvas.draw()
+    stats.reset()
+    # one draw per canvas for the backgrounds of every view on it
+    mouse_event(raw, 'button_press_event', 1, 1)
+    assert_equal(stats.count('draw'), 2)
+    mouse_event(raw, 'motion_notify_event', 1.5, 0.5)
+    mouse_event(raw, 'button_release_event', 1.5, 0.5)
+    assert_equal(stats.count('draw'), 2)
+    assert_equal(stats.count('blit'), 9)
+    # the backgrounds are reused by the next drag
+    mouse_event(raw, 'button_press_event', 1.5, 0.5)
+    mouse_event(raw, 'button_release_event', 1.5, 0.5)
+    assert_equal(stats.count('draw'), 2)
+    assert_equal(list(log_view.get_xdata()), [0, 1.5, 2, 3])
+    assert_equal(log_view.text[1].get_position(), (1.5, 0.5))
+    assert_equal(inset_view.drag_line.get_xdata()[1], 1.5)
+    assert log_view.index is None and inset_view.index is None
+    
+    # new data is shared as well, until unlinked
+    raw.set_ydata(np.array([4., 3., 2., 1.]))
+    assert inset.get_ydata() is line.get_ydata()
+    inset_view.unlink()
+    assert inset.get_ydata() is not line.get_ydata()
+    assert_equal(raw.views, [raw, log_view])
+
+@with_setup(setup_variables)
+def test_linked_view_subscriptions():
+    ''' subscriptions to a linked DragPlot should be sent the changes made by dragging in another view '''
+    raw = DragPlot(line)
+    other_line, = plt.figure().add_subplot(111).plot([0., 0., 0., 0.], [1., 1., 1., 1.], 'o-')
+    other = DragPlot(other_line)
+    raw.link(other)
+    sent = {'frame': [], 'release': []}
+    for rate in sent:
+        other.subscribe(lambda indices, old, new, rate=rate: sent[rate].append((indices, old, new)), rate=rate)
+    raw.canvas.draw()
+    other.canvas.draw()
+    
+    mouse_event(raw, 'button_press_event', 1, 1)
+    mouse_event(raw, 'motion_notify_event', 1.5, 0.5)
+    assert_equal(len(sent['frame']), 1)
+    assert_equal(sent['release'], [])
+    mouse_event(raw, 'button_release_event', 1.5, 0.5)
+    indices, old, new = sent['release'][0]
+    assert_equal(list(indices), [1])
+    assert_equal(old.tolist(), [[1, 1]])
+    assert_equal(new.tolist(), [[1.5, 0.5]])
+    
+    # changed data too
+    raw.set_ydata(np.array([4., 3., 2., 1.]))
+    assert_equal(list(sent['release'][-1][0]), [0, 1, 2])
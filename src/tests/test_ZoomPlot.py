@@ -2,6 +2,7 @@
 
 from interactive_plot import *
 from errors import *
+from function_adapter import adapt_function
 
 from nose.tools import assert_equal, assert_not_equal, assert_almost_equal, assert_raises, raises
 from nose import with_setup
@@ -60,3 +61,435 @@ def test_bad_changing_function():
     z = zoom[0]
     assert_raises(NotAFunction, z.set_function, 3)
     assert_raises(NotAFunction, z.set_function, ClickPlot)
+
+def test_adaptive_sampling():
+    ''' ZoomPlot(f, sampling='adaptive') should follow a sharp peak more closely than a uniform sample, with fewer evaluations '''
+    ax = plt.figure().add_subplot(111)
+    peak = lambda x: np.exp(-100*x**2)
+    uniform = ZoomPlot(peak, ax, x_min=-5, x_max=5, Npoints=200)
+    adaptive = ZoomPlot(peak, ax, x_min=-5, x_max=5, Npoints=200, sampling='adaptive')
+    
+    x = np.linspace(-5, 5, 10001)
+    uniform_error = np.abs(np.interp(x, uniform.x, uniform.y) - peak(x)).max()
+    adaptive_error = np.abs(np.interp(x, adaptive.x, adaptive.y) - peak(x)).max()
+    assert adaptive_error < uniform_error
+    assert adaptive.sample_stats['evaluations'] <= 200
+    assert adaptive.sample_stats['uniform_equivalent'] > 200
+
+def test_bad_sampling_input():
+    ''' ZoomPlot(f, sampling=Z) should fail if Z is not a known sampling '''
+    ax = plt.figure().add_subplot(111)
+    assert_raises(BadSamplingInput, ZoomPlot, np.sin, ax, sampling='random')
+
+def test_bad_decimation_input():
+    ''' ZoomPlot(f, decimation=Z) should fail if Z is not a known decimation '''
+    ax = plt.figure().add_subplot(111)
+    assert_raises(BadDecimationInput, ZoomPlot, np.sin, ax, decimation='every other')
+
+def test_evaluation_cache():
+    ''' ZoomPlot(f, cache=True) should reuse evaluations of f when zooming back out or panning '''
+    ax = plt.figure().add_subplot(111)
+    calls = []
+    def f(x):
+        calls.append(np.size(x))
+        return np.sin(x)
+    zoom = ZoomPlot(f, ax, x_min=0, x_max=10, cache=True)
+    zoom.scale_x(0.5)
+    zoom.scale_x(2)
+    n_calls = len(calls)
+    zoom.set_xlim(0, 10)
+    assert_equal(len(calls), n_calls)
+    assert zoom.cache.hits > 0
+    assert all(np.sin(zoom.x) == zoom.y)
+    
+    # new function - nothing to reuse
+    zoom.set_function(np.cos)
+    zoom.set_xlim(0, 10)
+    assert all(np.cos(zoom.x) == zoom.y)
+
+def test_evaluation_cache_range():
+    ''' ZoomPlot(f, cache=True) should only evaluate f in the view, about Npoints times for a new view '''
+    ax = plt.figure().add_subplot(111)
+    evaluated = []
+    def f(x):
+        evaluated.extend(np.atleast_1d(x))
+        return np.sqrt(x)
+    zoom = ZoomPlot(f, ax, x_min=0.3, x_max=7.9, cache=True)
+    zoom.cache.clear()
+    del evaluated[:]
+    zoom.set_xlim(0.3, 7.9)
+    assert_equal((zoom.x[0], zoom.x[-1]), (0.3, 7.9))
+    assert all((0.3 <= x <= 7.9) for x in evaluated)  # eg. f is undefined outside
+    assert 100 <= len(evaluated) <= 2*100
+    assert_equal(zoom.sample_stats['evaluations'], len(evaluated))
+    assert all(np.sqrt(zoom.x) == zoom.y)
+    
+    # the same x-range after changing Npoints
+    zoom.set_Npoints(50)
+    assert_equal((zoom.x[0], zoom.x[-1]), (0.3, 7.9))
+    
+    # reversed range
+    zoom.set_xlim(7.9, 0.3)
+    assert_equal((zoom.x[0], zoom.x[-1]), (7.9, 0.3))
+    assert all(np.sqrt(zoom.x) == zoom.y)
+
+def test_background_evaluation():
+    ''' ZoomPlot(f, evaluation='thread') should show a preview from the old samples until the new ones are evaluated '''
+    ax = plt.figure().add_subplot(111)
+    zoom = ZoomPlot(np.sin, ax, x_min=0, x_max=10, evaluation='thread')
+    zoom.set_xlim(5, 15)
+    
+    # preview - old samples where they overlap, nothing beyond them
+    assert all(np.isnan(zoom.y[zoom.x > 10]))
+    assert np.abs(zoom.y[zoom.x < 10] - np.sin(zoom.x[zoom.x < 10])).max() < 0.01
+    
+    zoom.set_xlim(20, 30)   # supersedes the last zoom
+    zoom.wait_for_samples()
+    assert_equal((zoom.x.min(), zoom.x.max()), (20, 30))
+    assert all(zoom.y == np.sin(zoom.x))
+    assert not zoom.evaluator.pending()
+    zoom.close()
+
+def slow_square(x):
+    ''' picklable and slow enough to be superseded in a worker process '''
+    import time
+    time.sleep(0.05)
+    return x**2
+
+def test_background_chunks():
+    ''' BackgroundEvaluator should send at most one chunk per worker, and none of a superseded request after that '''
+    from background_evaluator import BackgroundEvaluator
+    evaluator = BackgroundEvaluator(slow_square, pool='process', workers=2)
+    evaluator.submit(np.arange(40.))
+    superseded = evaluator.request[2]
+    assert_equal(len(superseded), 2)
+    
+    evaluator.submit(np.arange(8.))
+    x, y = evaluator.result(wait=True)
+    assert_equal(list(y), list(x**2))
+    evaluator.close()
+    assert_equal(len(superseded), 2)
+
+def test_background_pools():
+    ''' ZoomPlots evaluating in the background should share one pool, stopped once every plot using it is closed '''
+    from background_evaluator import pools
+    ax = plt.figure().add_subplot(111)
+    first = ZoomPlot(np.sin, ax, evaluation='thread')
+    second = ZoomPlot(np.cos, ax, evaluation='thread')
+    kind = first.evaluator.kind
+    pool, users = pools[kind]
+    assert second.evaluator.pool is pool
+    
+    first.close()
+    assert first.evaluator is None
+    assert_equal(pools[kind], [pool, users-1])
+    second.close()
+    assert kind not in pools or users > 2
+    
+    # evaluated straight away once closed
+    first.set_xlim(0, 2)
+    assert all(first.y == np.sin(first.x))
+
+def test_decimation():
+    ''' ZoomPlot(f, decimation=Z) should draw about as many points as the axis has pixels, without losing peaks '''
+    ax = plt.figure().add_subplot(111)
+    spike = lambda x: np.where(np.abs(x-0.123456) < 1e-5, 1., 0.)
+    columns = int(ax.bbox.width)
+    for decimation in ['minmax', 'lttb']:
+        zoom = ZoomPlot(spike, ax, Npoints=10**5, decimation=decimation)
+        assert_equal(zoom.x.size, 10**5)
+        assert zoom.line.get_xdata().size <= 4*columns+2
+        assert_equal(zoom.line.get_ydata().max(), 1)
+        
+        zoom.set_xlim(0.1, 0.2)
+        assert zoom.line.get_xdata().size <= 4*columns+2
+        assert_equal(zoom.line.get_ydata().max(), 1)
+
+def test_lttb_peaks():
+    ''' lttb(x, y, threshold) should keep every bucket's highest and lowest sample '''
+    from decimation import lttb
+    x = np.linspace(0, 1, 10**4)
+    y = np.sin(20*x)
+    y[1234], y[5678] = 5., -5.
+    keep = lttb(x, y, 100)
+    assert keep.size <= 3*98+2
+    assert 1234 in keep and 5678 in keep
+    assert_equal(keep[0], 0)
+    assert_equal(keep[-1], x.size-1)
+
+def test_data_zoom_plot():
+    ''' DataZoomPlot(file) should draw a long memory mapped array with about as many points as the axis has pixels '''
+    import os, tempfile
+    data = np.zeros(10**6)
+    data[123456] = 1.
+    handle, file_name = tempfile.mkstemp(suffix='.npy')
+    os.close(handle)
+    np.save(file_name, data)
+    
+    ax = plt.figure().add_subplot(111)
+    zoom = DataZoomPlot(file_name, ax, x0=0, dx=1e-6)
+    columns = int(ax.bbox.width)
+    assert zoom.line.get_xdata().size <= 8*columns
+    assert_equal(zoom.y.max(), 1)
+    
+    # zoomed right in - the samples themselves
+    zoom.set_xlim(0.12345, 0.12346)
+    index = np.round(zoom.x/1e-6).astype(int)
+    assert_equal(list(index), range(index[0], index[0]+index.size))
+    assert index[0] <= 123450 and index[-1] >= 123460
+    assert_equal(list(zoom.y), list(data[index]))
+    
+    # a unicode file name works too, and there's no function to change
+    other = DataZoomPlot(unicode(file_name), ax, x0=0, dx=1e-6)
+    assert_equal(other.y.max(), 1)
+    assert not hasattr(other, 'set_function')
+    assert not hasattr(other, 'set_Npoints')
+    
+    del zoom, other
+    os.remove(file_name)
+
+def test_bad_data_input():
+    ''' DataZoomPlot(Z) should fail if Z is not a 1-D array '''
+    ax = plt.figure().add_subplot(111)
+    assert_raises(NotNumpyArray, DataZoomPlot, [1, 2, 3], ax)
+    assert_raises(NotNumpyArray, DataZoomPlot, np.zeros((3, 3)), ax)
+
+def test_instrumentation():
+    ''' ZoomPlot.instrument() should time set_xlim and every evaluation of f '''
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    zoom = ZoomPlot(np.sin, ax, x_min=0, x_max=10, Npoints=50, cache=True)
+    stats = zoom.instrument()
+    zoom.set_xlim(0, 20)
+    zoom.set_xlim(5, 30, draw=False)
+    assert_equal(stats.count('set_xlim'), 2)
+    assert_equal(stats.count('draw'), 1)
+    assert stats.count('f') > 0
+    zoom.set_function(np.cos)
+    evaluations = stats.count('f')
+    zoom.set_xlim(0, 40, draw=False)
+    assert stats.count('f') > evaluations
+    stats.reset()
+    assert_equal(stats.names(), [])
+
+def test_function_adapter():
+    ''' adapt_function(f) should find whether f works on arrays, and evaluate arrays with it either way '''
+    import math
+    x = np.linspace(-1, 3, 3000)
+    vector = adapt_function(np.sin)
+    assert_equal(vector.kind, 'vector')
+    scalar = adapt_function(lambda x: math.sin(x) if x > 0 else 0.)
+    assert_equal(scalar.kind, 'scalar')
+    assert all(scalar(x) == np.where(x > 0, np.sin(x), 0))
+    assert_equal(scalar(2.), math.sin(2.))
+    
+    # works on arrays, except those with negative values
+    def partly(x):
+        if np.any(np.asarray(x) < 0): raise ValueError
+        return np.sqrt(x)
+    partial = adapt_function(partly)
+    assert_equal(partial.kind, 'vector')
+    y = partial(x)
+    assert_equal(partial.kind, 'partial')
+    assert all(y[x >= 0] == np.sqrt(x[x >= 0]))
+    assert np.isnan(y[x < 0]).all()
+    assert_equal(adapt_function(partly).kind, 'partial')
+    
+    # arithmetic errors are gaps, and the check isn't repeated
+    calls = []
+    def reciprocal(x):
+        calls.append(x)
+        return 1/float(x)
+    assert_equal(adapt_function(reciprocal).kind, 'scalar')
+    assert np.isnan(adapt_function(reciprocal)(np.array([0., 1.]))[0])
+    n_calls = len(calls)
+    adapt_function(reciprocal)
+    assert_equal(len(calls), n_calls)
+    
+    # one array call finds a vector f
+    calls = []
+    def square(x):
+        calls.append(x)
+        return x**2
+    assert_equal(adapt_function(square).kind, 'vector')
+    assert_equal(len(calls), 1)
+    
+    # any kind of number will do
+    rotate = adapt_function(lambda x: np.exp(1j*x))
+    assert_equal(rotate.kind, 'vector')
+    assert all(rotate(x) == np.exp(1j*x))
+    assert_equal(adapt_function(lambda x: complex(x, 1)).kind, 'scalar')
+    assert_raises(NotAFunction, adapt_function, lambda x: 'x')
+    
+    # ZoomPlot plots functions of single numbers too, keeping f as it is
+    g = lambda x: math.exp(-x)
+    zoom = ZoomPlot(g, plt.figure().add_subplot(111), x_min=0, x_max=2)
+    assert np.allclose(zoom.y, np.exp(-zoom.x))
+    assert zoom.f is g
+
+def test_blit_redraw():
+    ''' ZoomPlot should redraw its axis by blitting when zooming, drawing the same picture as a full draw '''
+    fig = plt.figure()
+    ax = fig.add_subplot(121)
+    fig.add_subplot(122).plot([0, 1], [0, 1])
+    zoom = ZoomPlot(np.sin, ax, x_min=0, x_max=10)
+    stats = zoom.instrument()
+    zoom.set_xlim(0, 10)
+    draws = 1
+    assert_equal(stats.count('draw'), draws)
+    for x_min, x_max in [(1, 9), (2, 8), (3, 4)]:
+        zoom.set_xlim(x_min, x_max)
+        blitted = fig.canvas.tostring_rgb()
+        assert_equal(stats.count('draw'), draws)
+        # compare with a full draw
+        fig.canvas.draw()
+        draws += 1
+        assert blitted == fig.canvas.tostring_rgb()
+    
+    # anything else changing in the figure needs a full draw
+    fig.axes[1].set_title('changed')
+    zoom.set_xlim(0, 10)
+    assert_equal(stats.count('draw'), draws+1)
+
+def test_debounced_scroll_zoom():
+    ''' scrolling should move the view straight away, and f should only be evaluated once the zooming settles '''
+    from matplotlib.backend_bases import MouseEvent, KeyEvent
+    ax = plt.figure().add_subplot(111)
+    calls = []
+    def f(x):
+        calls.append(np.size(x))
+        return np.sin(x)
+    zoom = ZoomPlot(f, ax, x_min=0, x_max=10, interactive=True)
+    n_calls = len(calls)
+    width = ax.get_xlim()[1]-ax.get_xlim()[0]   # with the axis margins, if any
+    px, py = ax.transData.transform((2., 0.))
+    for step in range(20):
+        event = MouseEvent('scroll_event', zoom.canvas, px, py, step=1)
+        zoom.canvas.callbacks.process('scroll_event', event)
+    x_min, x_max = ax.get_xlim()
+    assert_almost_equal(x_max-x_min, width*1.2**-20)
+    assert x_min < 2 < x_max
+    assert_equal(len(calls), n_calls)
+    zoom.settle()
+    assert_equal(len(calls), n_calls+1)
+    assert_almost_equal(zoom.x.min(), x_min)
+    zoom.settle()
+    assert_equal(len(calls), n_calls+1)
+    
+    # keys
+    event = KeyEvent('key_press_event', zoom.canvas, '-', px, py)
+    zoom.canvas.callbacks.process('key_press_event', event)
+    assert_almost_equal(ax.get_xlim()[1]-ax.get_xlim()[0], width*1.2**-19)
+    
+    # panning keys which don't clash with matplotlib's back / forward keys
+    x_min, x_max = ax.get_xlim()
+    event = KeyEvent('key_press_event', zoom.canvas, 'shift+right', px, py)
+    zoom.canvas.callbacks.process('key_press_event', event)
+    assert_almost_equal(ax.get_xlim()[0], x_min+0.1*(x_max-x_min))
+    event = KeyEvent('key_press_event', zoom.canvas, 'right', px, py)
+    zoom.canvas.callbacks.process('key_press_event', event)
+    assert_almost_equal(ax.get_xlim()[0], x_min+0.1*(x_max-x_min))
+    
+    # scale_y zooms this plot's y axis
+    y_min, y_max = ax.get_ylim()
+    zoom.scale_y(2, draw=False)
+    assert_almost_equal(ax.get_ylim()[1]-ax.get_ylim()[0], 2*(y_max-y_min))
+
+def test_drag_pan():
+    ''' dragging with the left button should pan the x axis, and sample f when it is released '''
+    from matplotlib.backend_bases import MouseEvent
+    ax = plt.figure().add_subplot(111)
+    zoom = ZoomPlot(np.sin, ax, x_min=0, x_max=10, interactive=True)
+    x_min = ax.get_xlim()[0]    # with the axis margins, if any
+    # mouse positions on screen, from where the data is before panning
+    pixels = dict((x, ax.transData.transform((x, 0.))) for x in [5, 6, 7])
+    def send(name, x):
+        px, py = pixels[x]
+        zoom.canvas.callbacks.process(name, MouseEvent(name, zoom.canvas, px, py, button=1))
+    send('button_press_event', 5)
+    send('motion_notify_event', 6)
+    send('motion_notify_event', 7)
+    send('button_release_event', 7)
+    assert_almost_equal(ax.get_xlim()[0], x_min-2)
+    assert_almost_equal(zoom.x.min(), x_min-2)
+    
+    # not interactive unless asked
+    other = ZoomPlot(np.sin, plt.figure().add_subplot(111))
+    assert other.cids is None
+
+def test_record_and_replay_zoom():
+    ''' a zooming session recorded with EventRecorder should zoom the same way (keys and shift+scroll too) when replayed, re-sampling f once it settles '''
+    import os, tempfile
+    from matplotlib.backend_bases import MouseEvent, KeyEvent
+    from interactive_plot import EventRecorder, EventReplayer
+    def session():
+        ax = plt.figure().add_subplot(111)
+        zoom = ZoomPlot(np.sin, ax, x_min=0, x_max=10, interactive=True)
+        ax.set_ylim(-1, 1)
+        return zoom
+    zoom = session()
+    recorder = EventRecorder(zoom.fig)
+    px, py = zoom.axis.transData.transform((2., 0.))
+    send = zoom.canvas.callbacks.process
+    send('scroll_event', MouseEvent('scroll_event', zoom.canvas, px, py, step=2))
+    send('scroll_event', MouseEvent('scroll_event', zoom.canvas, px, py, step=1, key='shift'))
+    for key in ['-', 'up', 'shift+left']:
+        send('key_press_event', KeyEvent('key_press_event', zoom.canvas, key, px, py))
+    zoom.settle()
+    recorder.stop()
+    assert_equal(list(recorder.events['key']), ['', 'shift', '-', 'up', 'shift+left'])
+    
+    # replayed from a file, the view is re-sampled once, after the last event
+    handle, file_name = tempfile.mkstemp(suffix='.npy')
+    os.close(handle)
+    recorder.save(file_name)
+    replayed = session()
+    replayer = EventReplayer(unicode(file_name), replayed.fig)
+    os.remove(file_name)
+    x = replayed.x
+    replayer.replay(speed=None)
+    assert_almost_equal(replayed.axis.get_xlim(), zoom.axis.get_xlim())
+    assert_almost_equal(replayed.axis.get_ylim(), zoom.axis.get_ylim())
+    assert replayed.x is not x
+    assert_almost_equal(replayed.x.min(), zoom.axis.get_xlim()[0])
+    
+    # events further apart than the settle delay are re-sampled one by one
+    replayed = session()
+    events = recorder.events
+    events['time'] = np.arange(events.size)
+    samples = []
+    replayed.set_samples = lambda x, y: (samples.append(x), ZoomPlot.set_samples(replayed, x, y))
+    EventReplayer(events, replayed.fig).replay(speed=None)
+    # the shift+scroll and up key only zoom y
+    assert_equal(len(samples), 3)
+
+def test_multi_zoom_plot():
+    ''' MultiZoomPlot should sample every function on one x grid, calling stacked functions once for all their curves '''
+    import math
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    frequencies = np.arange(1, 21)[:, np.newaxis]
+    calls = []
+    def models(x):
+        calls.append(np.size(x))
+        return np.sin(frequencies*x)
+    zoom = MultiZoomPlot([models, np.cos, lambda x: math.exp(-x)], ax, x_min=0, x_max=2, Npoints=50)
+    assert_equal(len(zoom.lines), 22)
+    assert_equal(zoom.y.shape, (22, 50))
+    assert np.allclose(zoom.lines[3].get_ydata(), np.sin(4*zoom.x))
+    assert np.allclose(zoom.lines[21].get_ydata(), np.exp(-zoom.x))
+    
+    stats = zoom.instrument()
+    n_calls = len(calls)
+    zoom.set_xlim(1, 3)
+    zoom.scale_x(0.5)
+    assert_equal(len(calls), n_calls+2)         # one call per zoom for all 20 models
+    assert_equal(stats.count('blit'), 2)        # every redraw ends in one blit
+    assert all(line.get_xdata()[0] == zoom.x[0] for line in zoom.lines)
+    
+    zoom.set_functions(np.sin, draw=False)
+    assert_equal(len(zoom.lines), 1)
+    assert_equal(len(ax.lines), 1)
+    zoom.set_function(np.cos, draw=False)
+    assert np.allclose(zoom.line.get_ydata(), np.cos(zoom.x))
+    assert_raises(NotAFunction, zoom.set_functions, [np.sin, 3])
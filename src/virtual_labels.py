@@ -0,0 +1,67 @@
+import numpy as np
+
+from matplotlib.text import Text
+from label_collection import LabelCollection
+
+class VirtualLabels(LabelCollection):
+    ''' A LabelCollection which only draws the labels that can be seen
+
+        The labels are kept as data (offset arrays and the label list), and on
+        every draw only the points inside the axis are labelled - leaving out a
+        point whose label would land on one already drawn (anchored less than a
+        label height away), and stopping at max_labels. The labels are drawn by
+        a pool of Text artists, reused from one draw to the next, so the number
+        of artists and the drawing time depend on what is on screen rather than
+        the number of points '''
+
+    def __init__(self, axis, x, y, labels, transform, size=20, max_labels=200):
+        LabelCollection.__init__(self, axis, x, y, labels, transform, size=size)
+        self.axis = axis
+        self.size = size
+        self.max_labels = max_labels
+        self.pool = []                      # Text artists, one per label drawn
+        self.shown = np.array([], dtype=int)    # indices of the labels last drawn
+
+    def visible(self):
+        ''' indices of the labels to draw at the current view - of points inside
+            the axis, one per label height, at most max_labels of them '''
+        xy = self.axis.transData.transform(np.column_stack((self.x, self.y)))
+        box = self.axis.bbox
+        inside = np.isfinite(xy).all(axis=1)
+        inside[inside] = ((xy[inside, 0] >= box.x0) & (xy[inside, 0] <= box.x1) &
+                          (xy[inside, 1] >= box.y0) & (xy[inside, 1] <= box.y1))
+        # leave out a label being animated on its own
+        if self.single_index is not None and self.single_text.get_animated():
+            inside[self.single_index] = False
+        index = np.flatnonzero(inside)
+        if index.size == 0:
+            return index
+
+        # the first point in each label sized cell of the screen gets the label
+        cell = max(1., self.size*self.axis.figure.dpi/72.)
+        ix = np.floor((xy[index, 0]-box.x0)/cell).astype(int)
+        iy = np.floor((xy[index, 1]-box.y0)/cell).astype(int)
+        cells = ix*(int(box.height/cell)+2) + iy
+        first = np.unique(cells, return_index=True)[1]
+        return index[np.sort(first)][:self.max_labels]
+
+    def label_text(self, k):
+        ''' the k'th Text of the pool, made if the pool isn't that big yet '''
+        while len(self.pool) <= k:
+            t = Text(0, 0, '', size=self.size)
+            t.set_transform(self.text_transform)
+            t.set_figure(self.axis.figure)
+            t.set_clip_box(self.axis.bbox)
+            self.pool.append(t)
+        return self.pool[k]
+
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+        self.shown = self.visible()
+        for k, i in enumerate(self.shown):
+            t = self.label_text(k)
+            t.set_position((self.x[i], self.y[i]))
+            t.set_text(self.labels[i])
+            t.draw(renderer)
+        self.stale = False
@@ -1,115 +1,206 @@
 import numpy as np
 
-from sanitise_input import SanitiseInput
+from zoom_view import ZoomView
+from function_adapter import adapt_function
+from adaptive_sampling import adaptive_sample
+from evaluation_cache import EvaluationCache
+from background_evaluator import BackgroundEvaluator
+from decimation import minmax_decimate, lttb
+from instrumentation import Instrumented
 
-class ZoomPlot(SanitiseInput):
+class ZoomPlot(ZoomView):
     ''' Given a function and an axis, this allows us to zoom in and out along the 
-        x/y axes and have the function updated according to the new range '''
-    
-    def __init__(self, f, axis=None, x_min=0, x_max=1, Npoints=100):
+        x/y axes and have the function updated according to the new range
         
-        self.axis = self.sanitise_axis_input(axis)  # axis these plots are in
-        self.fig = self.axis.figure     # figure axis is in
-        self.canvas = self.fig.canvas   # canvas axis is in
+        With interactive=True the mouse and keyboard zoom and pan the axis (see
+        ZoomView), and f is only evaluated once the view stops changing '''
+    
+    def __init__(self, f, axis=None, x_min=0, x_max=1, Npoints=100,
+                 sampling='uniform', max_evaluations=None, cache=False,
+                 evaluation='direct', decimation=None, interactive=False):
         
+        self.setup_view(axis)   # axis, figure and canvas
         self.f = self.sanitise_function_input(f) # Plotted function
-        self.Npoints = Npoints  # Number of x values when plotting f
+        self.vector_f = adapt_function(self.f)  # f on arrays of x (timed if instrumented)
+        self.setup_sampling(Npoints, sampling, max_evaluations, cache, evaluation, decimation)
         
         # x/y values to (initially) plot
-        self.x = np.linspace(x_min, x_max, Npoints) 
-        self.y = f(self.x)
+        self.x, self.y = self.sample(x_min, x_max)
         self.line, = self.axis.plot(self.x, self.y)
+        if decimation is not None:
+            self.update_line()
+            # the number of pixels changes with the window size
+            self.cid_resize = self.canvas.mpl_connect('resize_event', self.on_resize)
+        
+        # zooming / panning with the mouse and keyboard
+        self.setup_interaction(interactive)
+    
+    def setup_sampling(self, Npoints, sampling='uniform', max_evaluations=None,
+                       cache=False, evaluation='direct', decimation=None):
+        ''' how f (already set, with vector_f) is sampled, evaluated and drawn '''
+        self.Npoints = Npoints  # Number of x values when plotting f
         
-    def plot(self, color='blue', linewidth=1):
-        ''' plot the function being studied '''
-        # convenience variables
-        self.line.set_color(color)
-        self.line.set_linewidth(linewidth)
-        self.canvas.draw()
+        # 'uniform' - f evaluated at Npoints evenly spaced x values
+        # 'adaptive' - more x values where the curve bends, up to max_evaluations of f
+        self.sampling = self.sanitise_sampling_input(sampling)
+        self.max_evaluations = max_evaluations  # None - same as Npoints
+        # optionally keep evaluations of f (uniform sampling) to reuse when zooming / panning
+        # (a tile per view's worth of samples)
+        self.cache = EvaluationCache(self.vector_f, tile_size=Npoints) if cache else None
+        # 'direct' - f evaluated straight away when zooming
+        # 'thread' / 'process' - f evaluated in a pool of workers (uniform sampling,
+        # no cache), with a preview from the old samples drawn until it is done
+        self.evaluation = self.sanitise_evaluation_input(evaluation)
+        self.evaluator = None
+        self.poll_timer = None  # checks for the background samples being ready
+        if evaluation != 'direct':
+            self.evaluator = BackgroundEvaluator(self.vector_f, pool=evaluation)
+            self.poll_timer = self.canvas.new_timer(interval=20)
+            self.poll_timer.add_callback(self.poll_samples)
+            # the workers are released when the figure is closed, if not before
+            self.cid_close = self.canvas.mpl_connect('close_event', self.on_close)
+        # number of evaluations of f used for the last sample, and for a uniform sample
+        self.sample_stats = {'evaluations': 0, 'uniform_evaluations': 0,
+                             'uniform_equivalent': 0}
+        
+        # None - every sample is drawn
+        # 'minmax' / 'lttb' - only as many samples as the axis has pixels are drawn
+        self.decimation = self.sanitise_decimation_input(decimation)
+        
+    def close(self):
+        ''' stops the plot responding to the mouse / keyboard, and releases the
+            background workers - f is evaluated directly from then on '''
+        ZoomView.close(self)
+        if self.evaluator is not None:
+            self.poll_timer.stop()
+            self.canvas.mpl_disconnect(self.cid_close)
+            self.evaluator.close()
+            self.evaluator = None
+            self.evaluation = 'direct'
+    
+    def on_close(self, event):
+        # the figure is closed
+        self.close()
     
     def set_function(self, f):
         ''' change the function being studied '''
         self.f = self.sanitise_function_input(f)
-        
-    def get_xlim(self):
-        return self.x.min(), self.x.max()
+        self.vector_f = adapt_function(self.f)
+        untimed = self.vector_f
+        if self.stats is not None:
+            self.vector_f = self.stats.timed('f', self.vector_f)
+        # evaluations of the old function are no use now
+        if self.cache is not None:
+            self.cache.clear()
+            self.cache.f = self.vector_f
+        if self.evaluator is not None:
+            self.evaluator.cancel()
+            # a timed f can't be sent to worker processes
+            self.evaluator.f = untimed if self.evaluation == 'process' else self.vector_f
     
-    def get_ylim(self):
-        return self.y.min(), self.y.max()
-        
-    def set_xlim(self, x_min=0, x_max=1, draw=True):
-        ''' re-plots x, f(x) )with the new x-range '''    
+    def instrument(self, stats=None):
+        ''' as Instrumented.instrument, and also times every evaluation of f ('f') -
+            except in worker processes '''
+        if self.stats is not None:
+            return self.stats
+        Instrumented.instrument(self, stats)
+        if self.vector_f is not None:
+            self.vector_f = self.stats.timed('f', self.vector_f)
+            if self.cache is not None:
+                self.cache.f = self.vector_f
+            if self.evaluation == 'thread':
+                self.evaluator.f = self.vector_f
+        return self.stats
+        
+    def sample(self, x_min, x_max):
+        ''' x values between x_min and x_max and f evaluated at them '''
+        if self.sampling == 'adaptive':
+            budget = self.max_evaluations or self.Npoints
+            width, height = self.axis.bbox.width, self.axis.bbox.height
+            x, y = adaptive_sample(self.vector_f, x_min, x_max, budget, width, height)
+            evaluations = x.size
+        elif self.cache is not None:
+            # x values fixed to the cache's grid, only new ones evaluate f
+            before = self.cache.evaluations
+            x, y = self.cache.sample(x_min, x_max, self.Npoints)
+            evaluations = self.cache.evaluations-before
+        else:
+            x = np.linspace(x_min, x_max, self.Npoints)
+            y = self.vector_f(x)
+            evaluations = x.size
+        
+        # how many evaluations a uniform sample would use - as it is, and to
+        # match the closest spacing of the samples actually used
+        spacing = np.diff(x).min() if x.size > 1 else 0
+        self.sample_stats['evaluations'] = evaluations
+        self.sample_stats['uniform_evaluations'] = self.Npoints
+        self.sample_stats['uniform_equivalent'] = \
+            int(round((x_max-x_min)/spacing)) + 1 if spacing > 0 else x.size
+        return x, y
+        
+    def preview(self, x_min, x_max):
+        ''' starts evaluating f for the new x-range in the background, and
+            returns the new x values with a rough y from the samples we have
+            (nan where there aren't any) to show until it's done '''
         x = np.linspace(x_min, x_max, self.Npoints)
-        y = self.f(x)
-        # set line data
-        self.line.set_xdata(x)
-        self.line.set_ydata(y)
-        # save line data
-        self.x = x
-        self.y = y
-        
-        # update x limits
-        self.axis.set_xlim(x_min, x_max)
-        # update the y limits too
-        self.axis.set_ylim(y.min(), y.max())
-        
+        self.evaluator.submit(x)
+        self.poll_timer.start()
+        y = np.interp(x, self.x, self.y, left=np.nan, right=np.nan)
+        return x, y
+    
+    def poll_samples(self):
+        ''' puts the background samples on the line once they are ready '''
+        if not self.evaluator.pending():
+            self.poll_timer.stop()
+            return
+        samples = self.evaluator.result()
+        if samples is not None:
+            self.poll_timer.stop()
+            self.set_samples(*samples)
+            self.redraw()
+    
+    def wait_for_samples(self, draw=True):
+        ''' blocks until the background samples are ready, and plots them '''
+        if self.evaluator is None or not self.evaluator.pending():
+            return
+        self.poll_timer.stop()
+        self.set_samples(*self.evaluator.result(wait=True))
         if draw:
-            self.canvas.draw()
+            self.redraw()
+    
+    def update_line(self):
+        ''' sets the line data to the samples - or with decimation, to the samples
+            that make a visible difference at the current x limits and axis width '''
+        if self.decimation is None:
+            self.line.set_xdata(self.x)
+            self.line.set_ydata(self.y)
+            return
+        
+        columns = max(1, int(self.axis.bbox.width))
+        if self.decimation == 'minmax':
+            x_min, x_max = self.axis.get_xlim()
+            keep = minmax_decimate(self.x, self.y, x_min, x_max, columns)
+        else:
+            keep = lttb(self.x, self.y, columns)
+        self.line.set_xdata(self.x[keep])
+        self.line.set_ydata(self.y[keep])
+    
+    def view_samples(self, x_min, x_max):
+        ''' x, f(x) for the new x-range - or a preview, while f is evaluated in
+            the background '''
+        if self.evaluator is not None and self.sampling == 'uniform' and self.cache is None:
+            return self.preview(x_min, x_max)
+        return self.sample(x_min, x_max)
         
-    def set_ylim(self, y_min, y_max, draw=True):
-        ''' sets new y range '''
-        self.axis.set_ylim(y_min, y_max)
-        if draw:
-            self.canvas.draw()
-            
     def set_Npoints(self, Npoints):
         ''' sets how many data points to use in plotting graph '''
         
         # update the Npoints, x, y data
         self.Npoints = Npoints
-        self.x = np.linspace(self.x.min(), self.x.max(), Npoints)
-        self.y = self.f(self.x)
+        self.x, self.y = self.sample(self.x.min(), self.x.max())
         
         # update the line
-        self.line.set_xdata(self.x)
-        self.line.set_ydata(self.y)
-        
-    def scale_rules(self, min, max, alpha):
-        ''' the set of rules of how to zoom in / out along a number line segment (min, max) '''
-        
-        if alpha <= 0:
-            raise BadZoomScale, "Bad zooming in/out factor - need positive numbers"
-        
-        # keep axis centered where it is
-        length = max-min
-        mid_point = (max+min)/2
-        
-        new_max = mid_point+0.5*length*alpha
-        new_min = mid_point-0.5*length*alpha
-            
-        return new_min, new_max
-            
-    def scale_x(self, alpha=1.2, draw=True):
-        ''' zooms in/out along x axis ''' 
-        # get current x limits
-        x_min, x_max = self.axis.get_xlim()
-        new_x_min, new_x_max = self.scale_rules(x_min, x_max, alpha)
-        # set new range
-        self.set_xlim(new_x_min, new_x_max, draw=draw)
-    
-    def scale_y(self, alpha=1.2, draw=True):
-        # get the currently selected ZoomPlot
-        if ZoomPlot.selected_ZoomPlot is None:
-            return
-        else:
-            selected = ZoomPlot.selected_ZoomPlot
-            ax = selected.axis
-        
-        # get current y limits
-        y_min, y_max = ax.get_ylim()
-        new_y_min, new_y_max = self.scale_rules(y_min, y_max, alpha)
-        # set new range
-        selected.set_ylim(new_y_min, new_y_max, draw=draw)
+        self.update_line()
         
 if __name__ == '__main__':
     ''' example usage of a zoomPlot class'''
@@ -122,6 +213,11 @@ if __name__ == '__main__':
     z.set_xlim(0,133*np.pi/4)
     z.set_Npoints(1000)
     z.plot()
+    
+    # the same, sampled adaptively with at most 400 evaluations of f
+    a = ZoomPlot(f, axis=z.axis, sampling='adaptive', max_evaluations=400)
+    a.set_xlim(0,133*np.pi/4)
+    a.plot(color='red')
 
     
     plt.show()
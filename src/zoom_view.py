@@ -0,0 +1,286 @@
+import numpy as np
+from matplotlib.transforms import Bbox
+
+from sanitise_input import SanitiseInput
+from instrumentation import Instrumented
+from drag_dispatcher import DragDispatcher
+from errors import BadZoomScale
+
+class ZoomView(SanitiseInput, Instrumented):
+    ''' The zooming / panning of an axis showing a line of samples, re-sampled
+        (with the sample(x_min, x_max) method of a subclass - eg. a function in
+        ZoomPlot, stored data in DataZoomPlot) for each new x-range
+
+        With interactive=True (or after connect()) the mouse and keyboard zoom
+        and pan the axis:
+            scroll wheel - zoom x about the mouse (y with shift held)
+            + / - keys - zoom x in / out, up / down keys - zoom y in / out
+            shift + left / right keys, dragging with the left button - pan x
+        (the plain left / right keys are left to matplotlib's back / forward)
+        The view moves straight away with the samples already drawn, and is only
+        re-sampled for the new x-range once it has stopped changing for
+        settle_delay seconds (or the mouse button is released) '''
+
+    timed_methods = ('set_xlim', 'sample')
+    blit_padding = 24   # points around the axis' tick labels stored for redraw()
+    zoom_factor = 1.2   # zoom per scroll wheel step / key press
+    pan_fraction = 0.1  # fraction of the x-range panned per key press
+    settle_delay = 0.2  # seconds without zooming / panning before re-sampling
+    pan_button = 1      # mouse button which pans
+
+    def setup_view(self, axis):
+        ''' the axis, figure and canvas the samples are drawn in '''
+        self.axis = self.sanitise_axis_input(axis)  # axis these plots are in
+        self.fig = self.axis.figure     # figure axis is in
+        self.canvas = self.fig.canvas   # canvas axis is in
+
+        # the rest of the figure around the axis, blitted under the axis when it's
+        # redrawn - (figure / axis layout, region, image)
+        self.blit_background = None
+
+    def setup_interaction(self, interactive):
+        ''' makes the timer re-sampling once zooming stops, and connects the
+            mouse / keyboard events if interactive '''
+        self.view_changed = False   # x-range moved since it was last sampled
+        self.pan_start = None       # (mouse x pixel, x limits) at the start of a pan
+        self.settle_timer = self.canvas.new_timer(interval=int(1000*self.settle_delay))
+        self.settle_timer.single_shot = True
+        self.settle_timer.add_callback(self.settle)
+        self.cids = None
+        if interactive:
+            self.connect()
+
+    def connect(self):
+        # connect all gui related events
+        self.cids = [self.canvas.mpl_connect('scroll_event', self.on_scroll),
+                     self.canvas.mpl_connect('key_press_event', self.on_key),
+                     self.canvas.mpl_connect('button_press_event', self.on_press),
+                     self.canvas.mpl_connect('motion_notify_event', self.on_motion),
+                     self.canvas.mpl_connect('button_release_event', self.on_release)]
+
+    def disconnect(self):
+        # disconnect all the stored connection ids
+        if self.cids is None: return
+        for cid in self.cids:
+            self.canvas.mpl_disconnect(cid)
+        self.cids = None
+
+    def close(self):
+        ''' stops the view responding to the mouse / keyboard '''
+        self.disconnect()
+        self.settle_timer.stop()
+
+    def navigating(self):
+        ''' whether the toolbar's own pan / zoom is switched on '''
+        toolbar = getattr(self.canvas, 'toolbar', None)
+        return toolbar is not None and bool(getattr(toolbar, 'mode', ''))
+
+    def on_scroll(self, event):
+        if event.inaxes is not self.axis or self.navigating(): return
+        alpha = self.zoom_factor**(-event.step)
+        if event.key == 'shift':
+            y_min, y_max = self.axis.get_ylim()
+            self.preview_ylim(*self.scale_rules(y_min, y_max, alpha, event.ydata))
+        else:
+            x_min, x_max = self.axis.get_xlim()
+            self.preview_xlim(*self.scale_rules(x_min, x_max, alpha, event.xdata))
+
+    def on_key(self, event):
+        if event.inaxes is not self.axis: return
+        x_min, x_max = self.axis.get_xlim()
+        y_min, y_max = self.axis.get_ylim()
+        shift = self.pan_fraction*(x_max-x_min)
+        if event.key in ('+', '='):
+            self.preview_xlim(*self.scale_rules(x_min, x_max, 1./self.zoom_factor))
+        elif event.key == '-':
+            self.preview_xlim(*self.scale_rules(x_min, x_max, self.zoom_factor))
+        elif event.key == 'up':
+            self.preview_ylim(*self.scale_rules(y_min, y_max, 1./self.zoom_factor))
+        elif event.key == 'down':
+            self.preview_ylim(*self.scale_rules(y_min, y_max, self.zoom_factor))
+        elif event.key == 'shift+left':
+            self.preview_xlim(x_min-shift, x_max-shift)
+        elif event.key == 'shift+right':
+            self.preview_xlim(x_min+shift, x_max+shift)
+
+    def on_press(self, event):
+        if event.inaxes is not self.axis or event.button != self.pan_button: return
+        if self.navigating(): return
+        self.pan_start = (event.x, self.axis.get_xlim())
+
+    def on_motion(self, event):
+        if self.pan_start is None: return
+        # a DragPlot picked up a point with this press - leave the view alone
+        dispatcher = DragDispatcher.dispatchers.get(self.canvas)
+        if dispatcher is not None and dispatcher.lock is not None:
+            self.pan_start = None
+            return
+        x0, (x_min, x_max) = self.pan_start
+        shift = (event.x-x0)*(x_max-x_min)/self.axis.bbox.width
+        self.preview_xlim(x_min-shift, x_max-shift)
+
+    def on_release(self, event):
+        if self.pan_start is None: return
+        self.pan_start = None
+        self.settle()
+
+    def preview_xlim(self, x_min, x_max):
+        ''' moves the view to the new x-range straight away, with the samples
+            already drawn - it's re-sampled once the view stops changing '''
+        self.axis.set_xlim(x_min, x_max)
+        self.redraw()
+        self.view_changed = True
+        self.settle_timer.stop()
+        self.settle_timer.start()
+
+    def preview_ylim(self, y_min, y_max):
+        ''' moves the view to the new y-range - no new samples are needed '''
+        self.axis.set_ylim(y_min, y_max)
+        self.redraw()
+
+    def settle(self):
+        ''' samples the current x-range, if zooming / panning has moved it '''
+        self.settle_timer.stop()
+        if not self.view_changed: return
+        self.view_changed = False
+        x_min, x_max = self.axis.get_xlim()
+        self.set_xlim(x_min, x_max)
+
+    def plot(self, color='blue', linewidth=1):
+        ''' plot the line being studied '''
+        # convenience variables
+        self.line.set_color(color)
+        self.line.set_linewidth(linewidth)
+        self.redraw()
+
+    def get_xlim(self):
+        return self.x.min(), self.x.max()
+
+    def get_ylim(self):
+        return self.y.min(), self.y.max()
+
+    def view_samples(self, x_min, x_max):
+        ''' x, y to draw for a new x-range straight away '''
+        return self.sample(x_min, x_max)
+
+    def set_samples(self, x, y):
+        ''' puts x, y on the line and fits the y limits to them '''
+        # save line data
+        self.x = x
+        self.y = y
+        # set line data
+        self.update_line()
+
+        # update the y limits too (ignoring undefined values)
+        finite = y[np.isfinite(y)]
+        if finite.size:
+            self.axis.set_ylim(finite.min(), finite.max())
+
+    def update_line(self):
+        ''' sets the line data to the samples '''
+        self.line.set_xdata(self.x)
+        self.line.set_ydata(self.y)
+
+    def on_resize(self, event):
+        # more or fewer pixels to fill - the backend redraws after resizing
+        self.update_line()
+
+    def set_xlim(self, x_min=0, x_max=1, draw=True):
+        ''' re-plots the samples with the new x-range '''
+        # update x limits
+        self.axis.set_xlim(x_min, x_max)
+        self.set_samples(*self.view_samples(x_min, x_max))
+
+        if draw:
+            self.redraw()
+
+    def redraw(self):
+        ''' draws the axis after its limits or line have changed - only the axis
+            (with its tick labels) is re-rendered, over a stored image of the rest
+            of the figure around it, and blitted. The whole canvas is drawn if
+            there's no good stored image - the figure has changed size, something
+            else in it has changed, or the tick labels no longer fit the region '''
+        renderer = getattr(self.fig, '_cachedRenderer', None)
+        if self.blit_background is None or renderer is None or not self.background_valid():
+            return self.full_redraw()
+        layout, region, background = self.blit_background
+        tight = self.axis.get_tightbbox(renderer)
+        if tight.x0 < region.x0 or tight.y0 < region.y0 or \
+           tight.x1 > region.x1 or tight.y1 > region.y1:
+            return self.full_redraw()
+
+        self.canvas.restore_region(background)
+        self.fig.draw_artist(self.axis)
+        self.canvas.blit(region)
+
+    def full_redraw(self):
+        ''' draws the whole canvas, storing the figure around the axis for redraw() '''
+        if not hasattr(self.canvas, 'copy_from_bbox'):
+            # backend can't blit
+            self.canvas.draw()
+            return
+        self.axis.set_animated(True)
+        try:
+            self.canvas.draw()
+        finally:
+            self.axis.set_animated(False)
+
+        # room around the axis for its tick labels to change
+        renderer = self.fig._cachedRenderer
+        pad = self.blit_padding*self.fig.dpi/72.
+        region = self.axis.get_tightbbox(renderer).padded(pad)
+        region = Bbox.intersection(region, self.fig.bbox) or self.fig.bbox
+        self.blit_background = (self.layout(), region, self.canvas.copy_from_bbox(region))
+
+        self.fig.draw_artist(self.axis)
+        self.canvas.blit(self.fig.bbox)
+
+    def layout(self):
+        ''' what the stored background depends on, apart from the other artists '''
+        return (tuple(self.fig.bbox.bounds), self.fig.dpi, tuple(self.axis.bbox.bounds))
+
+    def background_valid(self):
+        ''' whether the stored background still matches the figure - older matplotlib
+            has no 'stale' flag to tell if other artists have changed, then it never does '''
+        if self.blit_background[0] != self.layout():
+            return False
+        others = [a for a in self.fig.get_children() if a is not self.axis]
+        return not any(getattr(a, 'stale', True) for a in others)
+
+    def set_ylim(self, y_min, y_max, draw=True):
+        ''' sets new y range '''
+        self.axis.set_ylim(y_min, y_max)
+        if draw:
+            self.redraw()
+
+    def scale_rules(self, min, max, alpha, centre=None):
+        ''' the set of rules of how to zoom in / out along a number line segment (min, max)
+            - about centre, which stays where it is (the middle of min, max if None) '''
+
+        if alpha <= 0:
+            raise BadZoomScale, "Bad zooming in/out factor - need positive numbers"
+
+        # keep axis centered where it is
+        if centre is None:
+            centre = (max+min)/2.
+
+        new_max = centre+(max-centre)*alpha
+        new_min = centre-(centre-min)*alpha
+
+        return new_min, new_max
+
+    def scale_x(self, alpha=1.2, draw=True):
+        ''' zooms in/out along x axis '''
+        # get current x limits
+        x_min, x_max = self.axis.get_xlim()
+        new_x_min, new_x_max = self.scale_rules(x_min, x_max, alpha)
+        # set new range
+        self.set_xlim(new_x_min, new_x_max, draw=draw)
+
+    def scale_y(self, alpha=1.2, draw=True):
+        ''' zooms in/out along y axis '''
+        # get current y limits
+        y_min, y_max = self.axis.get_ylim()
+        new_y_min, new_y_max = self.scale_rules(y_min, y_max, alpha)
+        # set new range
+        self.set_ylim(new_y_min, new_y_max, draw=draw)